@@ -0,0 +1,336 @@
+from typing import Deque, Dict, List, Optional, Tuple
+from collections import Counter, deque
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from models import QuizStatistics, QuizSubmission
+
+logger = logging.getLogger(__name__)
+
+# name -> (span, bucket width) in seconds; memory per window is span / width buckets
+WINDOWS: Dict[str, Tuple[int, int]] = {
+    "hour": (3600, 60),
+    "day": (86400, 900),
+    "week": (7 * 86400, 3600),
+}
+
+# Answers are free text from the client; cap what a single value can cost
+MAX_VALUE_LENGTH = 64
+MAX_DISTINCT_PER_BUCKET = 32
+OTHER = "Other"
+
+# All-time popular answers are tracked with a bounded Space-Saving sketch
+SKETCH_CAPACITY = 100
+
+
+def _normalize(value: Optional[str]) -> str:
+    return (value or "Unknown").strip()[:MAX_VALUE_LENGTH] or "Unknown"
+
+
+class Tally:
+    """Quiz/lead counts and answer frequencies for one span of time"""
+
+    def __init__(self):
+        self.quizzes = 0
+        self.leads = 0
+        self.budgets: Counter = Counter()
+        self.fuels: Counter = Counter()
+
+    @staticmethod
+    def _bounded_key(counter: Counter, value: str) -> str:
+        if value in counter or len(counter) < MAX_DISTINCT_PER_BUCKET:
+            return value
+        return OTHER
+
+    def add(self, event: Dict):
+        if event["type"] == "quiz":
+            self.quizzes += 1
+            self.budgets[self._bounded_key(self.budgets, event["budget_range"])] += 1
+            self.fuels[self._bounded_key(self.fuels, event["fuel_preference"])] += 1
+        elif event["type"] == "lead":
+            self.leads += 1
+
+    def merge(self, other: "Tally", sign: int = 1):
+        self.quizzes += sign * other.quizzes
+        self.leads += sign * other.leads
+        for mine, theirs in ((self.budgets, other.budgets), (self.fuels, other.fuels)):
+            for key, count in theirs.items():
+                mine[key] += sign * count
+                if mine[key] <= 0:
+                    del mine[key]
+
+    def to_dict(self) -> Dict:
+        return {"quizzes": self.quizzes, "leads": self.leads, "budgets": self.budgets, "fuels": self.fuels}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Tally":
+        tally = cls()
+        tally.quizzes, tally.leads = data["quizzes"], data["leads"]
+        tally.budgets, tally.fuels = Counter(data["budgets"]), Counter(data["fuels"])
+        return tally
+
+
+class SlidingWindow:
+    """Rolling tally over the last `span` seconds, kept in fixed-width buckets.
+
+    The running total is updated as events arrive and buckets expire, so
+    reading it never rescans events. Resolution is one bucket width.
+    """
+
+    def __init__(self, span: int, width: int):
+        self.span = span
+        self.width = width
+        self.buckets: Deque[Tuple[int, Tally]] = deque()
+        self.total = Tally()
+        # Latest time the window has been expired up to
+        self.now = 0.0
+
+    def add(self, event: Dict):
+        start = int(event["ts"]) // self.width * self.width
+        if start + self.width <= self.now - self.span:
+            # Arrived after its bucket already left the window
+            return
+        if not self.buckets or start > self.buckets[-1][0]:
+            self.buckets.append((start, Tally()))
+            bucket = self.buckets[-1][1]
+        else:
+            # Events from other workers can land slightly out of order in the log
+            position = len(self.buckets)
+            while position > 0 and self.buckets[position - 1][0] > start:
+                position -= 1
+            if position > 0 and self.buckets[position - 1][0] == start:
+                bucket = self.buckets[position - 1][1]
+            else:
+                bucket = Tally()
+                self.buckets.insert(position, (start, bucket))
+        bucket.add(event)
+        self.total.add(event)
+        self.expire(event["ts"])
+
+    def expire(self, now: float):
+        self.now = max(self.now, now)
+        while self.buckets and self.buckets[0][0] + self.width <= self.now - self.span:
+            _, bucket = self.buckets.popleft()
+            self.total.merge(bucket, sign=-1)
+
+    def to_list(self) -> List:
+        return [[start, bucket.to_dict()] for start, bucket in self.buckets]
+
+    def restore(self, buckets: List):
+        for start, data in buckets:
+            bucket = Tally.from_dict(data)
+            self.buckets.append((start, bucket))
+            self.total.merge(bucket)
+
+
+class SpaceSaving:
+    """Space-Saving top-k sketch: at most `capacity` counters, heavy hitters kept exactly
+    once they dominate, counts of newcomers overestimated by at most the evicted minimum.
+    """
+
+    def __init__(self, capacity: int, counts: Optional[Dict[str, int]] = None):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = dict(counts or {})
+
+    def offer(self, item: str):
+        if item in self.counts:
+            self.counts[item] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = 1
+        else:
+            victim = min(self.counts, key=self.counts.__getitem__)
+            self.counts[item] = self.counts.pop(victim) + 1
+
+    def top(self, k: int) -> List[str]:
+        return [item for item, _ in Counter(self.counts).most_common(k)]
+
+
+class QuizAnalytics:
+    """Quiz and lead analytics from an append-only event log.
+
+    Requests only enqueue events. A background thread appends them to
+    `events.ndjson` (one O_APPEND write per batch, so several workers can
+    share the file), then tails the file and folds every new event into
+    all-time totals, Space-Saving sketches and the sliding windows. Every
+    worker therefore reports the same numbers. State is checkpointed with
+    the log offset it covers, so a restart only replays the tail.
+    """
+
+    def __init__(self, directory: str, flush_seconds: float, checkpoint_seconds: float):
+        self.log_path = os.path.join(directory, "events.ndjson")
+        self.checkpoint_path = os.path.join(directory, "checkpoint.json")
+        self.flush_seconds = flush_seconds
+        self.checkpoint_seconds = checkpoint_seconds
+        os.makedirs(directory, exist_ok=True)
+
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_checkpoint = time.monotonic()
+        self._reset()
+        self._load_checkpoint()
+
+    def _reset(self):
+        self.offset = 0
+        self.totals = Tally()
+        self.budget_sketch = SpaceSaving(SKETCH_CAPACITY)
+        self.fuel_sketch = SpaceSaving(SKETCH_CAPACITY)
+        self.windows = {name: SlidingWindow(span, width) for name, (span, width) in WINDOWS.items()}
+
+    # Recording (request path)
+
+    def record_quiz(self, quiz: QuizSubmission):
+        self._pending.put({
+            "type": "quiz",
+            "ts": time.time(),
+            "budget_range": _normalize(quiz.budget_range),
+            "fuel_preference": _normalize(quiz.fuel_preference),
+            "vehicle_quality": _normalize(quiz.vehicle_quality),
+            "body_type": _normalize(quiz.body_type),
+        })
+
+    def record_lead(self):
+        self._pending.put({"type": "lead", "ts": time.time()})
+
+    # Reading
+
+    def statistics(self, window: str = "all", top: int = 5) -> QuizStatistics:
+        with self._lock:
+            if window == "all":
+                tally = self.totals
+                budgets, fuels = self.budget_sketch.top(top), self.fuel_sketch.top(top)
+            else:
+                sliding = self.windows[window]
+                sliding.expire(time.time())
+                tally = sliding.total
+                budgets = [key for key, _ in tally.budgets.most_common(top)]
+                fuels = [key for key, _ in tally.fuels.most_common(top)]
+            return QuizStatistics(
+                total_submissions=tally.quizzes,
+                popular_budget_ranges=budgets,
+                popular_fuel_types=fuels,
+                conversion_rate=round(tally.leads / tally.quizzes, 4) if tally.quizzes else 0.0,
+                total_leads=tally.leads,
+                window=window,
+            )
+
+    # Background thread
+
+    def _apply(self, event: Dict):
+        self.totals.add(event)
+        if event["type"] == "quiz":
+            self.budget_sketch.offer(event["budget_range"])
+            self.fuel_sketch.offer(event["fuel_preference"])
+        for sliding in self.windows.values():
+            sliding.add(event)
+
+    def _write_pending(self):
+        lines = []
+        while True:
+            try:
+                lines.append(json.dumps(self._pending.get_nowait()) + "\n")
+            except queue.Empty:
+                break
+        if not lines:
+            return
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, "".join(lines).encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def _consume_log(self):
+        try:
+            size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return
+        if size < self.offset:
+            logger.warning("⚠️ Analytics log shrank - rebuilding statistics from scratch")
+            with self._lock:
+                self._reset()
+        if size == self.offset:
+            return
+
+        with open(self.log_path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        # Only whole lines; a write still in progress is picked up next time
+        end = chunk.rfind(b"\n") + 1
+        events = []
+        for line in chunk[:end].splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logger.warning("⚠️ Skipping malformed analytics event")
+        with self._lock:
+            for event in events:
+                self._apply(event)
+            self.offset += end
+
+    def _save_checkpoint(self):
+        with self._lock:
+            state = {
+                "offset": self.offset,
+                "totals": self.totals.to_dict(),
+                "budget_sketch": self.budget_sketch.counts,
+                "fuel_sketch": self.fuel_sketch.counts,
+                "windows": {name: sliding.to_list() for name, sliding in self.windows.items()},
+            }
+            payload = json.dumps(state)
+        tmp_path = f"{self.checkpoint_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+            self.offset = state["offset"]
+            self.totals = Tally.from_dict(state["totals"])
+            self.budget_sketch = SpaceSaving(SKETCH_CAPACITY, state["budget_sketch"])
+            self.fuel_sketch = SpaceSaving(SKETCH_CAPACITY, state["fuel_sketch"])
+            for name, buckets in state["windows"].items():
+                if name in self.windows:
+                    self.windows[name].restore(buckets)
+            logger.info(f"📊 Restored analytics checkpoint at offset {self.offset}")
+        except FileNotFoundError:
+            pass
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable analytics checkpoint: {e}")
+            self._reset()
+
+    def _tick(self):
+        self._write_pending()
+        self._consume_log()
+        if time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds:
+            self._save_checkpoint()
+            self._last_checkpoint = time.monotonic()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self._tick()
+            except Exception as e:
+                logger.error(f"❌ Analytics update failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="quiz-analytics", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Flush queued events and checkpoint"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._tick()
+        self._save_checkpoint()
@@ -0,0 +1,83 @@
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar, Union
+import asyncio
+import logging
+
+from metrics import BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesces concurrent calls into batches.
+
+    `submit` parks the caller until its item has been processed. Items are
+    collected for up to `window` seconds after the first one arrives, or
+    until `max_size` are waiting, then handed to `handler` in one call.
+    The handler returns one result per item, in order; an Exception in
+    that list is raised to that item's caller only, while an exception
+    from the handler itself is raised to every caller in the batch.
+
+    Callers that give up (e.g. client disconnects) simply stop waiting;
+    the rest of their batch is unaffected.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[T]], Awaitable[List[Union[R, Exception]]]],
+        window: float,
+        max_size: int,
+    ):
+        self.name = name
+        self.handler = handler
+        self.window = window
+        self.max_size = max_size
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Strong references so running batches aren't garbage collected
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]):
+        BATCH_SIZE.labels(self.name).observe(len(batch))
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        if len(results) != len(batch):
+            logger.error(f"❌ {self.name} batch returned {len(results)} results for {len(batch)} items")
+            results = list(results)[:len(batch)]
+            results += [RuntimeError(f"{self.name} batch returned no result")] * (len(batch) - len(results))
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
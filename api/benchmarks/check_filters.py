@@ -0,0 +1,130 @@
+"""Brute-force check of FilterIndex against filtering the catalog car by car.
+
+Run from the api/ directory:
+
+    python -m benchmarks.check_filters [--catalog-sizes 300,5000] [--combinations 400]
+
+Random CarFilters combinations (including unknown values, odd casing and
+empty filters) are run through the index and compared with testing every
+car directly: the matching cars in catalog order and every facet count,
+in display order. The larger default catalog has more distinct prices
+than RANGE_STEPS, so the patched range-bitmap path is covered as well as
+the exact one. Exits non-zero on the first mismatch.
+"""
+from typing import Dict, List, Optional
+import argparse
+import random
+import sys
+
+from benchmarks.synthetic import BODY_TYPES, BRANDS, FUEL_TYPES, STOCK_LEVELS, make_catalog
+from filters import FACETS, SEATS_FACET, FilterIndex, iter_bits
+from models import CarFilters
+from similarity import parse_price_bounds, parse_seats
+
+CHOICES = {
+    "fuel_types": FUEL_TYPES,
+    "body_types": BODY_TYPES,
+    "brands": BRANDS,
+    "stock_levels": STOCK_LEVELS,
+}
+
+
+def messy_catalog(size: int) -> List[Dict]:
+    """Synthetic catalog with some unpriced cars and untidy field values"""
+    cars = make_catalog(size, seed=size)
+    for car in cars[::23]:
+        car["price_range"] = "Contact for quote"
+    for car in cars[5::31]:
+        car["body_type"] = f" {car['body_type'].lower()} "
+        car["brand"] = car["brand"].upper()
+    return cars
+
+
+def random_filters(rng: random.Random) -> CarFilters:
+    values = {}
+    for attribute, choices in CHOICES.items():
+        if rng.random() < 0.4:
+            picked = rng.sample(choices, rng.randint(1, 3))
+            if rng.random() < 0.2:
+                picked.append("Unknown")
+            values[attribute] = [rng.choice([value, value.lower(), value.upper()]) for value in picked]
+    if rng.random() < 0.4:
+        values["budget_min"] = rng.randrange(10, 260) * 1000
+    if rng.random() < 0.4:
+        values["budget_max"] = rng.randrange(10, 280) * 1000
+    if rng.random() < 0.3:
+        values["seats_min"] = rng.randint(2, 9)
+    return CarFilters(**values)
+
+
+def _normalise(value) -> str:
+    return str(value).strip().lower()
+
+
+def matches(car: Dict, filters: CarFilters, skip: Optional[str] = None) -> bool:
+    """Whether one car passes every filter except the `skip` facet's"""
+    for field, attribute in FACETS.items():
+        wanted = getattr(filters, attribute)
+        if wanted and field != skip and _normalise(car.get(field, "")) not in {_normalise(value) for value in wanted}:
+            return False
+    if filters.budget_min is not None or filters.budget_max is not None:
+        bounds = parse_price_bounds(car.get("price_range", ""))
+        if bounds is None:
+            return False
+        if filters.budget_min is not None and bounds[1] < filters.budget_min:
+            return False
+        if filters.budget_max is not None and bounds[0] > filters.budget_max:
+            return False
+    if filters.seats_min is not None and skip != SEATS_FACET and parse_seats(car.get("seats", "5")) < filters.seats_min:
+        return False
+    return True
+
+
+def facet_counts(cars: List[Dict], filters: CarFilters) -> Dict[str, Dict[str, int]]:
+    facets = {}
+    for field in list(FACETS) + [SEATS_FACET]:
+        # The first spelling seen for a value is the one displayed
+        displays: Dict[str, str] = {}
+        counts: Dict[str, int] = {}
+        for car in cars:
+            display = str(car.get(field, "")).strip()
+            key = displays.setdefault(_normalise(display), display)
+            counts[key] = counts.get(key, 0) + matches(car, filters, skip=field)
+        order = (lambda display: parse_seats(display)) if field == SEATS_FACET else (lambda display: display.lower())
+        facets[field] = {display: counts[display] for display in sorted(counts, key=order) if display}
+    return facets
+
+
+def check(catalog_size: int, combinations: int) -> int:
+    cars = messy_catalog(catalog_size)
+    index = FilterIndex(cars)
+    rng = random.Random(catalog_size)
+    for _ in range(combinations):
+        filters = random_filters(rng)
+        mask, facets = index.query(filters)
+        expected = [position for position, car in enumerate(cars) if matches(car, filters)]
+        got = list(iter_bits(mask, len(cars)))
+        assert got == expected, f"{filters}: {len(got)} matches, expected {len(expected)}"
+        expected_facets = facet_counts(cars, filters)
+        assert [list(values.items()) for values in facets.values()] == \
+            [list(values.items()) for values in expected_facets.values()], f"{filters}: facet counts differ"
+    return combinations
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog-sizes", default="300,5000", help="Comma-separated catalog sizes")
+    parser.add_argument("--combinations", type=int, default=400, help="Random filter combinations per catalog")
+    args = parser.parse_args(argv)
+    for size in [int(size) for size in args.catalog_sizes.split(",")]:
+        try:
+            checked = check(size, args.combinations)
+        except AssertionError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ {checked} filter combinations match a car-by-car filter over {size} cars")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Brute-force check of QuizPreviewIndex against per-car scoring.
+
+Run from the api/ directory:
+
+    python -m benchmarks.check_preview [--catalog-size 500]
+
+Every combination of answered/unanswered questions is previewed through
+one index (so cached prefixes get reused) and compared with scoring each
+car directly: the "still matching" count, the top pick and, once all six
+questions are answered, score_car itself. Exits non-zero on the first
+mismatch.
+"""
+from typing import Dict, Optional, Tuple
+import argparse
+import itertools
+import sys
+
+from benchmarks.synthetic import make_catalog
+from models import QuizSubmission
+from preview import BASE_POINTS, BONUS_POINTS, MAX_JITTER, MAX_POINTS, QUESTIONS, QuizPreviewIndex
+from scoring import MIN_GOOD_SCORE, jitter_points, quality_penalty, score_car
+
+# None = not answered yet
+OPTIONS: Dict[str, Tuple[Optional[str], ...]] = {
+    "body_type": (None, "SUV", "Sedan"),
+    "budget_range": (None, "Under $25k", "$35k-$50k", "$50k-$70k", "$70k-$100k", "$100k+"),
+    "seats_needed": (None, "5", "7"),
+    "vehicle_quality": (None, "Everyday", "Premium", "Luxury"),
+    "fuel_preference": (None, "Hybrid", "Electric", "Petrol", "Diesel"),
+    "timeframe": (None, "Ready now", "Later"),
+}
+
+
+def expected(car: Dict, answers: Dict[str, str]) -> Tuple[int, int]:
+    """(partial score, best reachable score) for one car, the slow way"""
+    base = sum(points(car, answers[question]) for question, (points, _) in BASE_POINTS.items() if question in answers)
+    remaining = sum(MAX_POINTS[question] for question in BASE_POINTS if question not in answers)
+    bonus, remaining_bonus = 0, 0
+    quality = answers.get("vehicle_quality")
+    penalty = quality_penalty(car, quality) if quality is not None else 0
+    for question, (points, _) in BONUS_POINTS.items():
+        if question in answers:
+            bonus += points(car, answers[question])
+        else:
+            remaining_bonus += MAX_POINTS[question]
+    if "budget_range" in answers and quality is not None:
+        bonus += jitter_points(car, answers["budget_range"], quality)
+    else:
+        remaining_bonus += MAX_JITTER
+    score = min(max(base - penalty, 0) + bonus, 100)
+    ceiling = max(base + remaining - penalty, 0) + bonus + remaining_bonus
+    return score, ceiling
+
+
+def check(catalog_size: int) -> int:
+    cars = make_catalog(catalog_size)
+    index = QuizPreviewIndex(cars)
+    checked = 0
+    for combination in itertools.product(*(OPTIONS[question] for question in QUESTIONS)):
+        answers = {question: answer for question, answer in zip(QUESTIONS, combination) if answer is not None}
+        still_matching, top = index.preview(answers)
+
+        scores, matching = [], 0
+        for car in cars:
+            score, ceiling = expected(car, answers)
+            scores.append(score)
+            matching += ceiling >= MIN_GOOD_SCORE
+        if len(answers) == len(QUESTIONS):
+            quiz = QuizSubmission(**answers)
+            assert scores == [score_car(car, quiz) for car in cars], f"score_car differs for {answers}"
+        best = max(scores)
+        expected_top = (scores.index(best), best) if answers else None
+
+        assert still_matching == matching, f"{answers}: {still_matching} still matching, expected {matching}"
+        assert top == expected_top, f"{answers}: top pick {top}, expected {expected_top}"
+        checked += 1
+    return checked
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog-size", type=int, default=500)
+    args = parser.parse_args(argv)
+    try:
+        checked = check(args.catalog_size)
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ {checked} answer combinations match per-car scoring over {args.catalog_size} cars")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Brute-force check of SimilarityIndex against a linear scan.
+
+Run from the api/ directory:
+
+    python -m benchmarks.check_similarity [--catalog-sizes 50,2000] [--queries 100]
+
+For a sample of cars and several k, the index's neighbours (distance and
+car, nearest first, ties to the lower catalog position) are compared with
+scoring every other car directly. Some cars lose their price so the
+median fallback is covered too. Exits non-zero on the first mismatch.
+"""
+from typing import Dict, List, Tuple
+import argparse
+import math
+import random
+import statistics
+import sys
+
+from benchmarks.synthetic import make_catalog
+from similarity import PRICE_WEIGHT, SimilarityIndex, bucket_key, bucket_penalty, parse_price
+
+K_VALUES = (1, 5, 10, 50)
+
+
+def messy_catalog(size: int) -> List[Dict]:
+    """Synthetic catalog where every 17th car has no parseable price"""
+    cars = make_catalog(size, seed=size)
+    for car in cars[::17]:
+        car["price_range"] = "Contact for quote"
+    return cars
+
+
+def linear_scan(cars: List[Dict], index: int, k: int) -> List[Tuple[float, int]]:
+    """The k nearest cars to cars[index] by scoring every other car"""
+    prices = [parse_price(car.get("price_range", "")) for car in cars]
+    known = [price for price in prices if price]
+    default_price = statistics.median(known) if known else 1.0
+    log_prices = [math.log(price or default_price) for price in prices]
+    keys = [bucket_key(car) for car in cars]
+    distances = [
+        (bucket_penalty(keys[index], keys[other]) + PRICE_WEIGHT * abs(log_prices[index] - log_prices[other]), other)
+        for other in range(len(cars)) if other != index
+    ]
+    return sorted(distances)[:k]
+
+
+def check(catalog_size: int, queries: int) -> int:
+    cars = messy_catalog(catalog_size)
+    index = SimilarityIndex(cars)
+    checked = 0
+    for query in random.Random(catalog_size).sample(range(catalog_size), min(queries, catalog_size)):
+        expected = linear_scan(cars, query, max(K_VALUES))
+        for k in K_VALUES:
+            got = index.neighbours(query, k)
+            assert got == expected[:k], f"car {query}, k={k}: {got} != {expected[:k]}"
+            checked += 1
+    return checked
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog-sizes", default="50,2000", help="Comma-separated catalog sizes")
+    parser.add_argument("--queries", type=int, default=100, help="Cars queried per catalog")
+    args = parser.parse_args(argv)
+    for size in [int(size) for size in args.catalog_sizes.split(",")]:
+        try:
+            checked = check(size, args.queries)
+        except AssertionError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ {checked} neighbour queries match a linear scan over {size} cars")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
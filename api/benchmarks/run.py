@@ -0,0 +1,243 @@
+"""Microbenchmarks for matching, search and serialization on synthetic catalogs.
+
+Run from the api/ directory:
+
+    python -m benchmarks.run                         # 1k, 10k, 100k, 1M cars
+    python -m benchmarks.run --sizes 1000,10000      # quicker subset
+    python -m benchmarks.run --output results.json   # machine-readable results
+    python -m benchmarks.run --save-baseline         # refresh the stored baseline
+
+Every run is compared against benchmarks/baseline.json (for the
+benchmark/size pairs present in both) and exits non-zero when a best-of-n
+time is more than --tolerance slower than its baseline. The minimum is
+compared rather than the median because scheduler and GC noise only ever
+add time, and a case only fails if it is still slow after --retries
+re-timings. Even so, minimums of sub-millisecond cases drift by 30-60%
+between identical runs on a busy machine, so the default tolerance (50%)
+is meant to catch algorithmic regressions rather than small drifts.
+Timings are machine dependent - refresh the baseline when moving to
+different hardware.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+
+from benchmarks.synthetic import make_airtable_record, make_catalog
+from catalog import CatalogSnapshot, search_make_model, stream_ndjson
+from finance import FinanceTable, resolve_terms
+from models import CarFilters, QuizSubmission
+from responses import api_response
+from scoring import score_cars, top_matches
+from services import AirtableService
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+
+FILTERS = CarFilters(
+    budget_min=40000,
+    budget_max=80000,
+    fuel_types=["Hybrid", "Petrol"],
+    body_types=["SUV"],
+    seats_min=5,
+)
+
+FINANCE_TERMS = resolve_terms(deposit=5000, term_years=7, annual_rate=7.5)
+
+QUIZ = QuizSubmission(
+    body_type="SUV",
+    budget_range="$50k-$70k",
+    vehicle_quality="Premium",
+    fuel_preference="Hybrid",
+    seats_needed="5",
+    timeframe="Ready now",
+)
+
+
+def _drain(stream) -> int:
+    """Consume an async byte stream, returning the number of bytes produced"""
+    async def consume():
+        total = 0
+        async for chunk in stream:
+            total += len(chunk)
+        return total
+    return asyncio.run(consume())
+
+
+def build_cases(catalog: List[Dict]) -> Dict[str, Callable[[], object]]:
+    """Benchmarks over one catalog size; each callable is one timed operation"""
+    scored = score_cars(catalog, QUIZ)
+    # The snapshot and FinanceTable.apply rewrite weekly_repayment, so they get their own copies
+    snapshot = CatalogSnapshot([dict(car) for car in catalog])
+    finance_cars = [dict(car) for car in catalog]
+    records = [make_airtable_record(car) for car in catalog]
+    # Mapping only needs _extract_image_url, so skip __init__ (which connects to Airtable)
+    mapper = AirtableService.__new__(AirtableService)
+    matches = top_matches(scored, k=2)
+    # 100 lookups per timed run, spread over the catalog
+    probe_ids = snapshot.ids[:: max(1, len(snapshot) // 100)][:100]
+
+    return {
+        "scoring": lambda: score_cars(catalog, QUIZ),
+        "top_k": lambda: top_matches(scored, k=2),
+        "match_cars_to_quiz": lambda: top_matches(score_cars(catalog, QUIZ), k=2),
+        "search_make_model": lambda: search_make_model(catalog, "toyota", "rav4"),
+        "record_mapping": lambda: [mapper._record_to_car(record) for record in records],
+        "serialize_quiz_response": lambda: api_response(
+            "Quiz processed successfully with real data",
+            {"matches": matches, "explanation": "x" * 300, "total_matches": 2},
+        ).body,
+        "serialize_catalog_ndjson": lambda: _drain(stream_ndjson(snapshot, 0, len(snapshot), None)),
+        "similar_cars": lambda: [snapshot.similar(car_id, 10) for car_id in probe_ids],
+        "filter_with_facets": lambda: snapshot.filter(FILTERS, 0, 50),
+        # Repeat preview of a finished quiz: prefix cache hit plus the final lane pass
+        "quiz_preview": lambda: snapshot.preview_quiz(QUIZ.model_dump()),
+        # Per-snapshot cost: parse prices, amortize at default terms, rewrite weekly_repayment
+        "finance_catalog": lambda: FinanceTable(finance_cars).apply(finance_cars),
+        "finance_estimate": lambda: snapshot.finance_estimates(probe_ids, FINANCE_TERMS),
+    }
+
+
+def time_case(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "repeat": repeat,
+    }
+
+
+def _repeats(size: int, repeat: int) -> int:
+    # Fewer repeats for big catalogs so a full run stays in minutes
+    return max(3, min(repeat, 2_000_000 // size))
+
+
+def run(sizes: List[int], repeat: int, only: Optional[List[str]]) -> List[Dict]:
+    results = []
+    for size in sizes:
+        catalog = make_catalog(size)
+        cases = build_cases(catalog)
+        n = _repeats(size, repeat)
+        for name, fn in cases.items():
+            if only and name not in only:
+                continue
+            timing = time_case(fn, n)
+            results.append({"name": name, "size": size, **timing})
+            print(
+                f"{name:<26} {size:>9,} cars  median {timing['median_s'] * 1e3:>10.3f}ms"
+                f"  min {timing['min_s'] * 1e3:>10.3f}ms  (n={n})",
+                flush=True,
+            )
+        del catalog, cases
+        gc.collect()
+    return results
+
+
+def retime(results: List[Dict], repeat: int):
+    """Time `results` again, keeping each one's best minimum"""
+    for size in sorted({result["size"] for result in results}):
+        catalog = make_catalog(size)
+        cases = build_cases(catalog)
+        for result in results:
+            if result["size"] == size:
+                timing = time_case(cases[result["name"]], _repeats(size, repeat))
+                result["min_s"] = min(result["min_s"], timing["min_s"])
+        del catalog, cases
+        gc.collect()
+
+
+def slower(results: List[Dict], baseline: Dict, tolerance: float) -> List[Tuple[Dict, Dict]]:
+    """(result, baseline entry) pairs whose minimum is beyond tolerance"""
+    reference = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+    pairs = []
+    for result in results:
+        base = reference.get((result["name"], result["size"]))
+        if base is not None and result["min_s"] > base["min_s"] * (1 + tolerance):
+            pairs.append((result, base))
+    return pairs
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions against the baseline, as human-readable lines"""
+    return [
+        f"{result['name']} @ {result['size']:,}: min {base['min_s'] * 1e3:.3f}ms -> "
+        f"{result['min_s'] * 1e3:.3f}ms ({result['min_s'] / base['min_s']:.2f}x)"
+        for result, base in slower(results, baseline, tolerance)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated catalog sizes")
+    parser.add_argument("--repeat", type=int, default=20, help="Max repetitions per benchmark")
+    parser.add_argument("--only", help="Comma-separated benchmark names to run")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown before failing (0.5 = 50%%)")
+    parser.add_argument("--retries", type=int, default=2, help="Re-time suspected regressions this many times")
+    args = parser.parse_args()
+
+    # Hot paths log per record; benchmarks measure the code, not the log handler
+    logging.disable(logging.CRITICAL)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    only = args.only.split(",") if args.only else None
+    results = run(sizes, args.repeat, only)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found - run with --save-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for _ in range(args.retries):
+        suspects = [result for result, _ in slower(results, baseline, args.tolerance)]
+        if not suspects:
+            break
+        print(f"\nRe-timing {len(suspects)} case(s) beyond {args.tolerance:.0%}...", flush=True)
+        retime(suspects, args.repeat)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
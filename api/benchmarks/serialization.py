@@ -0,0 +1,133 @@
+"""Serialization cost per endpoint: default FastAPI path vs. the lean path.
+
+Run from the api/ directory:
+
+    python -m benchmarks.serialization [--catalog-size 1000] [--repeat 200]
+
+"Before" reproduces what FastAPI did for these endpoints: build pydantic
+models, wrap them in APIResponse, validate/serialize through the
+response_model field and render with the stdlib encoder. "After" is the
+`responses.api_response` path the endpoints use now.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import warnings
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from starlette.responses import JSONResponse
+
+from models import APIResponse, CarMatch
+from responses import api_response, compress_body, brotli
+from benchmarks.synthetic import make_catalog
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+RESPONSE_FIELD = create_model_field("Response", APIResponse, mode="serialization")
+
+
+def _car_match_kwargs(car):
+    return dict(
+        name=car["name"],
+        brand=car["brand"],
+        price_range=car["price_range"],
+        match_percentage=90,
+        stock_level=car["stock_level"],
+        fuel_type=car["fuel_type"],
+        body_type=car["body_type"],
+        seats=car["seats"],
+        image_url=car.get("image_url", ""),
+    )
+
+
+async def _render_default(data, message):
+    response = APIResponse(success=True, message=message, data=data)
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=response)
+    return JSONResponse(content).body
+
+
+# Before / after implementations per endpoint
+
+async def quiz_before(cars):
+    matches = [CarMatch(**_car_match_kwargs(car)) for car in cars]
+    data = {
+        "matches": [match.dict() for match in matches],
+        "explanation": "x" * 300,
+        "total_matches": len(matches),
+        "data_source": "airtable",
+    }
+    return await _render_default(data, "Quiz processed successfully with real data")
+
+
+async def quiz_after(cars):
+    matches = [CarMatch(**_car_match_kwargs(car)).model_dump() for car in cars]
+    data = {
+        "matches": matches,
+        "explanation": "x" * 300,
+        "total_matches": len(matches),
+        "data_source": "airtable",
+    }
+    return api_response("Quiz processed successfully with real data", data).body
+
+
+async def catalog_before(cars):
+    return await _render_default({"cars": cars}, f"Retrieved {len(cars)} cars")
+
+
+async def catalog_after(cars):
+    return api_response(f"Retrieved {len(cars)} cars", {"cars": cars}).body
+
+
+async def _time(fn, payload, repeat):
+    samples = []
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = await fn(payload)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), body
+
+
+async def run(catalog_size: int, repeat: int):
+    catalog = make_catalog(catalog_size)
+    cases = [
+        ("/quiz/submit", quiz_before, quiz_after, catalog[:2]),
+        ("/cars/search", catalog_before, catalog_after, catalog[:20]),
+        ("/test/cars", catalog_before, catalog_after, catalog),
+    ]
+
+    print(f"{'endpoint':<14} {'before':>11} {'after':>11} {'speedup':>8} {'bytes':>10}")
+    for endpoint, before, after, payload in cases:
+        n = repeat if len(payload) < 100 else max(5, repeat // 20)
+        t_before, _ = await _time(before, payload, n)
+        t_after, body = await _time(after, payload, n)
+        print(
+            f"{endpoint:<14} {t_before * 1e6:>9.1f}us {t_after * 1e6:>9.1f}us "
+            f"{t_before / t_after:>7.1f}x {len(body):>10,}"
+        )
+
+    body = api_response("catalog", {"cars": catalog}).body
+    print(f"\n/test/cars body with {catalog_size:,} cars:")
+    encodings = ["gzip", "br"] if brotli is not None else ["gzip"]
+    for encoding in encodings:
+        start = time.perf_counter()
+        compressed = compress_body(body, encoding)
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {encoding:<5} {len(body):>10,} -> {len(compressed):>9,} bytes "
+            f"({len(compressed) / len(body):.1%}) in {elapsed * 1e3:.1f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.catalog_size, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Synthetic catalog generation shared by the benchmark scripts"""
+from typing import Dict, List
+import random
+
+BRANDS = [
+    "Toyota", "Honda", "Mazda", "Subaru", "Hyundai", "Kia", "Nissan",
+    "BMW", "Mercedes-Benz", "Audi", "Lexus", "Porsche", "Volvo",
+    "Ford", "Volkswagen", "Tesla", "McLaren", "Ferrari",
+]
+MODELS = [
+    "Corolla", "Camry", "RAV4", "CR-V", "CX-5", "Forester", "Tucson",
+    "Sportage", "X-Trail", "3 Series", "C-Class", "Q5", "RX", "Cayenne",
+    "XC60", "Ranger", "Golf", "Model Y", "720S", "Roma", "Prius", "Leaf",
+]
+FUEL_TYPES = ["Petrol", "Diesel", "Hybrid", "Electric", "Plug-in Hybrid"]
+BODY_TYPES = ["SUV", "Sedan", "Hatchback", "Ute", "Wagon", "People Mover", "Sports"]
+STOCK_LEVELS = ["High", "Medium", "Low", "Available"]
+QUALITIES = ["Everyday", "Premium", "Luxury"]
+
+
+def make_car(i: int, rng: random.Random) -> Dict:
+    """Build one car record shaped like AirtableService.get_all_cars() output"""
+    low = rng.randrange(20, 250) * 1000
+    model = rng.choice(MODELS)
+    suffix = rng.choice(["", " Hybrid", " Sport", " GX", " Limited"])
+    return {
+        "id": f"rec{i:010d}",
+        "name": f"{model}{suffix}",
+        "brand": rng.choice(BRANDS),
+        "price_range": f"${low:,}-${low + rng.randrange(5, 30) * 1000:,}",
+        "fuel_type": rng.choice(FUEL_TYPES),
+        "body_type": rng.choice(BODY_TYPES),
+        "seats": rng.choice(["2", "4", "5", "5", "7", "8"]),
+        "vehicle_quality": rng.choice(QUALITIES),
+        "stock_level": rng.choice(STOCK_LEVELS),
+        "image_url": f"https://images.example.com/cars/{i}.jpg",
+        "weekly_repayment": f"${rng.randrange(120, 900)}/week",
+        "variants_in_range": rng.randrange(1, 6),
+        "popular": rng.choice(["Yes", "No"]),
+    }
+
+
+def make_catalog(size: int, seed: int = 42) -> List[Dict]:
+    """Deterministic catalog of `size` cars"""
+    rng = random.Random(seed)
+    return [make_car(i, rng) for i in range(size)]
+
+
+def make_airtable_record(car: Dict) -> Dict:
+    """Wrap a car dict in the raw Airtable 'Models' record shape"""
+    return {
+        "id": car["id"],
+        "createdTime": "2025-01-01T00:00:00.000Z",
+        "fields": {
+            "Model": car["name"],
+            "Brand": car["brand"],
+            "Price Range": car["price_range"],
+            "Fuel Type": car["fuel_type"],
+            "Body Type": car["body_type"],
+            "Seats": int(car["seats"]),
+            "Vehicle Quality": car["vehicle_quality"],
+            "Stock Level": car["stock_level"],
+            "Image Loading": [{"url": car["image_url"], "filename": "car.jpg"}],
+            "Weekly Repayment Estimate": car["weekly_repayment"],
+            "Variants In Range": car["variants_in_range"],
+            "Popular": car["popular"],
+        },
+    }
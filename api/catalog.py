@@ -0,0 +1,204 @@
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+from bisect import bisect_right
+import base64
+import itertools
+import time
+
+from filters import FilterIndex, iter_bits
+from finance import FinanceTable, Terms
+from models import CarFilters
+from preview import QuizPreviewIndex
+from responses import dumps
+from similarity import SimilarityIndex, similarity_score
+
+# Fields a catalog record exposes (see AirtableService._record_to_car)
+CATALOG_FIELDS = (
+    "id", "name", "brand", "price_range", "fuel_type", "body_type", "seats",
+    "vehicle_quality", "stock_level", "image_url", "weekly_repayment",
+    "variants_in_range", "popular",
+)
+
+# Records per streamed chunk - keeps per-chunk overhead low without
+# buffering more than a few hundred KB at a time
+STREAM_BATCH_SIZE = 200
+
+_versions = itertools.count(1)
+
+
+class CatalogSnapshot:
+    """Immutable view of the car catalog from a single Airtable fetch.
+
+    Records are ordered by Airtable record id so cursors stay valid across
+    refreshes. The dicts are shared between requests - callers must copy a
+    record before modifying it.
+    """
+
+    def __init__(self, cars: Iterable[Dict], source: str = "airtable",
+                 version: Optional[int] = None, age: float = 0.0):
+        self.cars: Tuple[Dict, ...] = tuple(sorted(cars, key=lambda car: car["id"]))
+        self.ids: List[str] = [car["id"] for car in self.cars]
+        self.source = source
+        # Snapshots loaded from the shared catalog keep its generation and age
+        self.version = next(_versions) if version is None else version
+        self.built_at = time.monotonic() - age
+        # Nearest-neighbour index for /cars/{id}/similar, built once per snapshot
+        self.similarity = SimilarityIndex(self.cars)
+        # Per-value bitmaps for /cars/filter
+        self.filters = FilterIndex(self.cars)
+        # Cached partial score vectors for /quiz/preview
+        self.quiz_preview = QuizPreviewIndex(self.cars)
+        # Weekly repayment estimates; the snapshot owns its records, so their
+        # weekly_repayment text is replaced before anyone else sees them
+        self.finance = FinanceTable(self.cars)
+        self.finance.apply(self.cars)
+
+    def __len__(self) -> int:
+        return len(self.cars)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.built_at
+
+    def _index_of(self, car_id: str) -> Optional[int]:
+        index = bisect_right(self.ids, car_id) - 1
+        if index >= 0 and self.ids[index] == car_id:
+            return index
+        return None
+
+    def get(self, car_id: str) -> Optional[Dict]:
+        """Look up a record by id"""
+        index = self._index_of(car_id)
+        return None if index is None else self.cars[index]
+
+    def similar(self, car_id: str, k: int) -> Optional[List[Dict]]:
+        """The k most similar cars (copies with a 0-100 `similarity`), or None for an unknown id"""
+        index = self._index_of(car_id)
+        if index is None:
+            return None
+        return [
+            {**self.cars[neighbour], "similarity": similarity_score(distance)}
+            for distance, neighbour in self.similarity.neighbours(index, k)
+        ]
+
+    def filter(self, filters: CarFilters, offset: int, limit: int) -> Tuple[List[Dict], int, Dict[str, Dict[str, int]]]:
+        """One page of cars matching `filters`, the total match count and facet counts"""
+        mask, facets = self.filters.query(filters)
+        matches = itertools.islice(iter_bits(mask, len(self.cars)), offset, offset + limit)
+        return [self.cars[index] for index in matches], mask.bit_count(), facets
+
+    def preview_quiz(self, answers: Dict[str, str]) -> Tuple[int, Optional[Dict]]:
+        """Cars still able to match the partial answers, and the current top pick (a copy with `match_score`)"""
+        still_matching, top = self.quiz_preview.preview(answers)
+        if top is None:
+            return still_matching, None
+        index, score = top
+        return still_matching, {**self.cars[index], "match_score": score}
+
+    def finance_estimates(self, car_ids: Iterable[str], terms: Terms) -> Tuple[List[Dict], List[str]]:
+        """Repayment estimates for the given ids under `terms`, plus the ids not in the catalog"""
+        estimates, not_found = [], []
+        for car_id in car_ids:
+            index = self._index_of(car_id)
+            if index is None:
+                not_found.append(car_id)
+                continue
+            car = self.cars[index]
+            estimates.append({
+                "id": car_id,
+                "name": car["name"],
+                "brand": car["brand"],
+                "price_range": car["price_range"],
+                "estimate": self.finance.estimate(index, terms),
+            })
+        return estimates, not_found
+
+    def page_bounds(self, cursor: Optional[str], limit: Optional[int]) -> Tuple[int, int]:
+        """Return the [start, stop) index range for a cursor/limit page"""
+        start = bisect_right(self.ids, decode_cursor(cursor)) if cursor else 0
+        stop = len(self.cars) if limit is None else min(start + limit, len(self.cars))
+        return start, stop
+
+    def next_cursor(self, stop: int) -> Optional[str]:
+        """Cursor for the page after index `stop`, or None at the end"""
+        if stop >= len(self.cars) or stop == 0:
+            return None
+        return encode_cursor(self.ids[stop - 1])
+
+
+# Search
+
+def search_make_model(cars: Iterable[Dict], make: str, model: str) -> List[Dict]:
+    """Same matching as the Airtable SEARCH formula (case-insensitive substrings)"""
+    make_upper, model_upper = make.upper(), model.upper()
+    return [
+        dict(car) for car in cars
+        if make_upper in car["brand"].upper() and model_upper in car["name"].upper()
+    ]
+
+
+# Cursors
+
+def encode_cursor(car_id: str) -> str:
+    """Opaque cursor pointing just after `car_id`"""
+    return base64.urlsafe_b64encode(car_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        decoded = base64.b64decode(padded.encode("ascii"), altchars=b"-_", validate=True)
+        return decoded.decode("utf-8")
+    except (UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+# Projection
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a `fields=` query value into a projection (None means all fields)"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in CATALOG_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # id is always returned so clients can build their own cursors
+    return tuple(dict.fromkeys(["id"] + requested))
+
+
+def project(car: Dict, fields: Optional[Sequence[str]]) -> Dict:
+    """Return the record restricted to `fields`"""
+    if fields is None:
+        return car
+    return {field: car.get(field) for field in fields}
+
+
+# Streaming encoders
+
+async def stream_ndjson(
+    snapshot: CatalogSnapshot, start: int, stop: int, fields: Optional[Sequence[str]]
+) -> AsyncIterator[bytes]:
+    """Yield records in [start, stop) as newline-delimited JSON"""
+    cars = snapshot.cars
+    for batch_start in range(start, stop, STREAM_BATCH_SIZE):
+        batch_stop = min(batch_start + STREAM_BATCH_SIZE, stop)
+        yield b"".join(
+            dumps(project(cars[i], fields)) + b"\n" for i in range(batch_start, batch_stop)
+        )
+
+
+async def stream_json(
+    snapshot: CatalogSnapshot, start: int, stop: int, fields: Optional[Sequence[str]]
+) -> AsyncIterator[bytes]:
+    """Yield records in [start, stop) as one chunked JSON document"""
+    cars = snapshot.cars
+    yield b'{"cars":['
+    for batch_start in range(start, stop, STREAM_BATCH_SIZE):
+        batch_stop = min(batch_start + STREAM_BATCH_SIZE, stop)
+        chunk = b",".join(dumps(project(cars[i], fields)) for i in range(batch_start, batch_stop))
+        yield chunk if batch_start == start else b"," + chunk
+    yield (
+        b'],"next_cursor":' + dumps(snapshot.next_cursor(stop))
+        + b',"snapshot_version":' + dumps(snapshot.version) + b"}"
+    )
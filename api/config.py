@@ -13,13 +13,94 @@ class Settings(BaseSettings):
     airtable_base_id: str = os.getenv("AIRTABLE_BASE_ID", "")
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     
+    # Upstream Endpoints (override to point at local stand-ins, see loadtest/)
+    airtable_endpoint_url: str = os.getenv("AIRTABLE_ENDPOINT_URL", "https://api.airtable.com")
+    openai_base_url: str = os.getenv("OPENAI_BASE_URL", "")
+    
     # Email Settings (from environment variables - SECURE!)
     lead_email: str = os.getenv("LEAD_EMAIL", "sourcing@bookatestdrive.com.au")
     smtp_host: str = os.getenv("SMTP_HOST", "smtp.gmail.com")
     smtp_port: int = int(os.getenv("SMTP_PORT", "587"))
     smtp_username: str = os.getenv("SMTP_USERNAME", "")
     smtp_password: str = os.getenv("SMTP_PASSWORD", "")
+    smtp_starttls: bool = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+    
+    # Catalog Snapshot
+    catalog_ttl_seconds: int = int(os.getenv("CATALOG_TTL_SECONDS", "300"))
+    
+    # Upstream Bulkheads (max concurrent calls, max queued, max queue wait in seconds)
+    airtable_max_concurrent: int = int(os.getenv("AIRTABLE_MAX_CONCURRENT", "4"))
+    airtable_max_queue: int = int(os.getenv("AIRTABLE_MAX_QUEUE", "16"))
+    airtable_queue_timeout: float = float(os.getenv("AIRTABLE_QUEUE_TIMEOUT", "2.0"))
+    openai_max_concurrent: int = int(os.getenv("OPENAI_MAX_CONCURRENT", "8"))
+    openai_max_queue: int = int(os.getenv("OPENAI_MAX_QUEUE", "32"))
+    openai_queue_timeout: float = float(os.getenv("OPENAI_QUEUE_TIMEOUT", "1.0"))
+    smtp_max_concurrent: int = int(os.getenv("SMTP_MAX_CONCURRENT", "2"))
+    smtp_max_queue: int = int(os.getenv("SMTP_MAX_QUEUE", "8"))
+    smtp_queue_timeout: float = float(os.getenv("SMTP_QUEUE_TIMEOUT", "2.0"))
+    
+    # Upstream Timeouts (seconds)
+    airtable_connect_timeout: float = float(os.getenv("AIRTABLE_CONNECT_TIMEOUT", "3.0"))
+    airtable_timeout: float = float(os.getenv("AIRTABLE_TIMEOUT", "15.0"))
+    openai_timeout: float = float(os.getenv("OPENAI_TIMEOUT", "10.0"))
+    smtp_timeout: float = float(os.getenv("SMTP_TIMEOUT", "15.0"))
+    
+    # Circuit Breakers (rates are 0-1 over the last breaker_window_size calls)
+    breaker_failure_rate: float = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    breaker_slow_call_rate: float = float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.8"))
+    breaker_window_size: int = int(os.getenv("BREAKER_WINDOW_SIZE", "20"))
+    breaker_minimum_calls: int = int(os.getenv("BREAKER_MINIMUM_CALLS", "5"))
+    breaker_open_seconds: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    airtable_slow_call_seconds: float = float(os.getenv("AIRTABLE_SLOW_CALL_SECONDS", "8.0"))
+    openai_slow_call_seconds: float = float(os.getenv("OPENAI_SLOW_CALL_SECONDS", "6.0"))
+    smtp_slow_call_seconds: float = float(os.getenv("SMTP_SLOW_CALL_SECONDS", "10.0"))
+    
+    # Shared state across uvicorn workers (catalog file + SQLite cache); empty disables
+    shared_state_dir: str = os.getenv("SHARED_STATE_DIR", "/tmp/car-quiz-shared")
+    explanation_cache_ttl_seconds: int = int(os.getenv("EXPLANATION_CACHE_TTL_SECONDS", "86400"))
+    
+    # Explanation micro-batching: explanations requested within the window share one OpenAI call (0 disables)
+    explanation_batch_window_ms: float = float(os.getenv("EXPLANATION_BATCH_WINDOW_MS", "0"))
+    explanation_batch_max_size: int = int(os.getenv("EXPLANATION_BATCH_MAX_SIZE", "8"))
+    explanation_batch_fallback: str = os.getenv("EXPLANATION_BATCH_FALLBACK", "single")  # items a batch reply misses: single (ask alone) or template
     
+    # Finance estimates (weekly repayments from the low end of each price range)
+    finance_annual_rate: float = float(os.getenv("FINANCE_ANNUAL_RATE", "8.99"))  # % p.a.
+    finance_term_years: int = int(os.getenv("FINANCE_TERM_YEARS", "5"))
+    finance_deposit_percent: float = float(os.getenv("FINANCE_DEPOSIT_PERCENT", "10"))
+    
+    # Quiz live preview (partial score vectors cached per answer prefix, ~2 bytes per car each);
+    # the entry count is lowered further so the cache stays within QUIZ_PREVIEW_CACHE_MB per worker
+    quiz_preview_cache_size: int = int(os.getenv("QUIZ_PREVIEW_CACHE_SIZE", "64"))
+    quiz_preview_cache_mb: int = int(os.getenv("QUIZ_PREVIEW_CACHE_MB", "32"))
+    
+    # Quiz Analytics (append-only event log + checkpoint, shared by all workers)
+    analytics_dir: str = os.getenv("ANALYTICS_DIR", "/tmp/car-quiz-analytics")
+    analytics_flush_seconds: float = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "1.0"))
+    analytics_checkpoint_seconds: float = float(os.getenv("ANALYTICS_CHECKPOINT_SECONDS", "60"))
+    
+    # Email Outbox (lead emails queued while SMTP is saturated or down)
+    email_outbox_dir: str = os.getenv("EMAIL_OUTBOX_DIR", "/tmp/car-quiz-outbox")
+    email_outbox_drain_seconds: float = float(os.getenv("EMAIL_OUTBOX_DRAIN_SECONDS", "60"))  # 0 disables the periodic retry
+    
+    # Response Serialization / Compression
+    compression_minimum_size: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    gzip_level: int = int(os.getenv("GZIP_LEVEL", "5"))
+    brotli_quality: int = int(os.getenv("BROTLI_QUALITY", "4"))
+    
+    # Admin / Profiling (admin features are disabled while ADMIN_TOKEN is empty)
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")
+    profile_dir: str = os.getenv("PROFILE_DIR", "/tmp/car-quiz-profiles")
+    profile_interval: float = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+    profile_max_seconds: float = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+
+    # Logging (records are written by a background thread, never on the event loop)
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = os.getenv("LOG_FORMAT", "json")  # json or text
+    log_queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    log_rate_limit: float = float(os.getenv("LOG_RATE_LIMIT", "100"))  # sampled hot-path records per second per logger, 0 = unlimited
+    log_sample_rate: float = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))  # share of hot-path debug records kept
+
     # CORS Configuration
     cors_origins: List[str] = [
         "http://localhost:3000",
@@ -0,0 +1,182 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from bisect import bisect_left, bisect_right
+import re
+
+from models import CarFilters
+from similarity import parse_price_bounds, parse_seats
+
+# Catalog field -> CarFilters attribute holding the accepted values
+FACETS: Dict[str, str] = {
+    "fuel_type": "fuel_types",
+    "body_type": "body_types",
+    "brand": "brands",
+    "stock_level": "stock_levels",
+}
+SEATS_FACET = "seats"
+
+# Cumulative bitmaps kept per numeric field. With at most this many
+# distinct values there is one per value and range queries are exact;
+# otherwise they are evenly spaced and a query patches in at most
+# len / (2 * RANGE_STEPS) cars on top of the nearest one
+RANGE_STEPS = 128
+
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+
+def _bitmap(indexes: Iterable[int], size: int) -> int:
+    """Bitmap (as an int) with the given bit positions set"""
+    bits = bytearray((size + 7) // 8)
+    for index in indexes:
+        bits[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(bits, "little")
+
+
+def iter_bits(mask: int, size: int) -> Iterator[int]:
+    """Positions of the set bits, lowest first"""
+    data = mask.to_bytes((size + 7) // 8, "little")
+    for match in _NONZERO_BYTE.finditer(data):
+        position = match.start()
+        byte = data[position]
+        for bit in range(8):
+            if byte >> bit & 1:
+                yield position * 8 + bit
+
+
+def _key(value) -> str:
+    return str(value).strip().lower()
+
+
+class RangeBitmaps:
+    """Bitmaps answering `value <= x` and `value >= x` for one numeric field.
+
+    Cars are sorted by value and cumulative bitmaps ("the first j cars")
+    are stored at value boundaries, or every len/RANGE_STEPS positions
+    when there are too many distinct values. A threshold becomes a
+    position by binary search; the bitmap is the nearest stored prefix
+    with the few cars in between added or removed. Cars without a value
+    never match.
+    """
+
+    def __init__(self, values: Sequence[Optional[float]], size: int):
+        present = [index for index, value in enumerate(values) if value is not None]
+        present.sort(key=values.__getitem__)
+        self.size = size
+        self.sorted_values = [values[index] for index in present]
+        self.sorted_indexes = present
+        boundaries = [
+            position for position in range(1, len(present))
+            if self.sorted_values[position] != self.sorted_values[position - 1]
+        ]
+        if len(boundaries) <= RANGE_STEPS:
+            self.positions = [0] + boundaries + [len(present)]
+        else:
+            step = -(-len(present) // RANGE_STEPS)
+            self.positions = list(range(0, len(present), step)) + [len(present)]
+
+        self.prefixes: List[int] = []
+        bits = bytearray((size + 7) // 8)
+        previous = 0
+        for position in self.positions:
+            for index in self.sorted_indexes[previous:position]:
+                bits[index >> 3] |= 1 << (index & 7)
+            self.prefixes.append(int.from_bytes(bits, "little"))
+            previous = position
+        self.all = self.prefixes[-1]
+
+    def _first(self, count: int) -> int:
+        """Bitmap of the `count` smallest values"""
+        slot = bisect_right(self.positions, count) - 1
+        below = self.positions[slot]
+        if below == count:
+            return self.prefixes[slot]
+        above = self.positions[slot + 1]
+        if count - below <= above - count:
+            return self.prefixes[slot] | _bitmap(self.sorted_indexes[below:count], self.size)
+        return self.prefixes[slot + 1] & ~_bitmap(self.sorted_indexes[count:above], self.size)
+
+    def at_most(self, x: float) -> int:
+        return self._first(bisect_right(self.sorted_values, x))
+
+    def at_least(self, x: float) -> int:
+        return self.all & ~self._first(bisect_left(self.sorted_values, x))
+
+
+class FilterIndex:
+    """Per-value bitmaps over a catalog snapshot for CarFilters queries.
+
+    Bit i stands for snapshot.cars[i]. Each filter becomes an OR of value
+    bitmaps (or a range bitmap) and filters combine with AND, all as
+    word-parallel big-int operations. Facet counts use the usual
+    "every other filter applied" rule, so picking a brand still shows how
+    many cars each other brand would give.
+    """
+
+    def __init__(self, cars: Sequence[Dict]):
+        self.size = len(cars)
+        self.everything = (1 << self.size) - 1
+
+        # facet -> normalised value -> (display value, bitmap)
+        self.values: Dict[str, Dict[str, Tuple[str, int]]] = {}
+        for field in list(FACETS) + [SEATS_FACET]:
+            # Group by raw value first - there are only a handful per field
+            raw_groups: Dict[object, List[int]] = {}
+            for index, car in enumerate(cars):
+                raw_groups.setdefault(car.get(field, ""), []).append(index)
+            values: Dict[str, Tuple[str, int]] = {}
+            for raw, indexes in raw_groups.items():
+                display = str(raw).strip()
+                key = _key(display)
+                known_display, bitmap = values.get(key, (display, 0))
+                values[key] = (known_display, bitmap | _bitmap(indexes, self.size))
+            self.values[field] = values
+
+        bounds = [parse_price_bounds(car.get("price_range", "")) for car in cars]
+        self.price_low = RangeBitmaps([b[0] if b else None for b in bounds], self.size)
+        self.price_high = RangeBitmaps([b[1] if b else None for b in bounds], self.size)
+        self.seats = RangeBitmaps([parse_seats(car.get("seats", "5")) for car in cars], self.size)
+
+    def _any_of(self, field: str, wanted: Sequence[str]) -> int:
+        bitmap = 0
+        for value in wanted:
+            entry = self.values[field].get(_key(value))
+            if entry is not None:
+                bitmap |= entry[1]
+        return bitmap
+
+    def _clauses(self, filters: CarFilters) -> Dict[str, int]:
+        """One bitmap per active filter, keyed by the facet it constrains"""
+        clauses: Dict[str, int] = {}
+        for field, attribute in FACETS.items():
+            wanted = getattr(filters, attribute)
+            if wanted:
+                clauses[field] = self._any_of(field, wanted)
+        # A car fits the budget when its price range overlaps [budget_min, budget_max]
+        if filters.budget_min is not None:
+            clauses["budget_min"] = self.price_high.at_least(filters.budget_min)
+        if filters.budget_max is not None:
+            clauses["budget_max"] = self.price_low.at_most(filters.budget_max)
+        if filters.seats_min is not None:
+            clauses[SEATS_FACET] = self.seats.at_least(filters.seats_min)
+        return clauses
+
+    def _combine(self, clauses: Dict[str, int], skip: Optional[str] = None) -> int:
+        mask = self.everything
+        for name, bitmap in clauses.items():
+            if name != skip:
+                mask &= bitmap
+        return mask
+
+    def query(self, filters: CarFilters) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """Matching bitmap and per-facet counts for every value"""
+        clauses = self._clauses(filters)
+        mask = self._combine(clauses)
+        facets = {}
+        for field, values in self.values.items():
+            base = self._combine(clauses, skip=field) if field in clauses else mask
+            order = (lambda item: parse_seats(item[0])) if field == SEATS_FACET else (lambda item: item[0].lower())
+            facets[field] = {
+                display: (base & bitmap).bit_count()
+                for display, bitmap in sorted(values.values(), key=order)
+                if display
+            }
+        return mask, facets
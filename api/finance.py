@@ -0,0 +1,107 @@
+from typing import Dict, Optional, Sequence, Tuple
+from array import array
+import math
+
+from config import settings
+from similarity import parse_price_bounds
+
+WEEKS_PER_YEAR = 52
+
+# (deposit amount or None, deposit %, term in years, interest rate % p.a.)
+Terms = Tuple[Optional[float], float, int, float]
+
+
+def default_terms() -> Terms:
+    """Terms used for the catalog's weekly_repayment text, read from settings on every call"""
+    return None, settings.finance_deposit_percent, settings.finance_term_years, settings.finance_annual_rate
+
+
+def resolve_terms(deposit: Optional[float] = None, deposit_percent: Optional[float] = None,
+                  term_years: Optional[int] = None, annual_rate: Optional[float] = None) -> Terms:
+    """Fill in whatever a caller left out from the defaults"""
+    _, default_percent, default_years, default_rate = default_terms()
+    return (
+        deposit,
+        default_percent if deposit_percent is None else deposit_percent,
+        default_years if term_years is None else term_years,
+        default_rate if annual_rate is None else annual_rate,
+    )
+
+
+def weekly_factor(annual_rate: float, term_years: int) -> float:
+    """Weekly repayment per dollar borrowed, fully amortized over the term"""
+    rate = annual_rate / 100 / WEEKS_PER_YEAR
+    weeks = term_years * WEEKS_PER_YEAR
+    if rate == 0:
+        return 1 / weeks
+    return rate / (1 - (1 + rate) ** -weeks)
+
+
+def format_weekly(amount: float) -> str:
+    return f"${amount:,.0f}/week"
+
+
+class FinanceTable:
+    """Weekly repayment estimates over a catalog snapshot.
+
+    Each car's price (the low end of its price range, NaN when it has
+    none) is parsed once into a float array. For a set of terms the
+    amortization factor is computed once and every repayment is a single
+    multiply over that array.
+    """
+
+    def __init__(self, cars: Sequence[Dict]):
+        prices = []
+        for car in cars:
+            bounds = parse_price_bounds(car.get("price_range", ""))
+            prices.append(bounds[0] if bounds else math.nan)
+        self.prices = array("d", prices)
+
+    @staticmethod
+    def principal(price: float, terms: Terms) -> float:
+        deposit, deposit_percent, _, _ = terms
+        if deposit is None:
+            deposit = price * deposit_percent / 100
+        # max() keeps NaN (no price) as NaN
+        return max(price - deposit, 0.0)
+
+    def weekly_repayments(self, terms: Terms) -> array:
+        """Weekly repayment for every car under `terms` (NaN where there is no price)"""
+        deposit, deposit_percent, term_years, annual_rate = terms
+        factor = weekly_factor(annual_rate, term_years)
+        if deposit is None:
+            # Percentage deposit: repayment is proportional to price
+            scale = (1 - deposit_percent / 100) * factor
+            return array("d", [price * scale for price in self.prices])
+        return array("d", [max(price - deposit, 0.0) * factor for price in self.prices])
+
+    def estimate(self, index: int, terms: Terms) -> Optional[Dict]:
+        """Repayment breakdown for one car, or None when it has no parseable price"""
+        price = self.prices[index]
+        if math.isnan(price):
+            return None
+        _, _, term_years, annual_rate = terms
+        principal = self.principal(price, terms)
+        weekly = principal * weekly_factor(annual_rate, term_years)
+        return {
+            "price": price,
+            "deposit": round(price - principal, 2),
+            "amount_financed": round(principal, 2),
+            "weekly_repayment": round(weekly, 2),
+            "total_repayable": round(weekly * term_years * WEEKS_PER_YEAR, 2),
+        }
+
+    def apply(self, cars: Sequence[Dict]):
+        """Replace each car's weekly_repayment text with the default-terms estimate.
+
+        Cars without a parseable price keep the text they came with
+        (e.g. Airtable's "Contact for quote").
+        """
+        # Catalogs repeat a limited set of prices, so format each amount once
+        texts: Dict[float, str] = {}
+        for car, weekly in zip(cars, self.weekly_repayments(default_terms())):
+            if not math.isnan(weekly):
+                text = texts.get(weekly)
+                if text is None:
+                    text = texts[weekly] = format_weekly(weekly)
+                car["weekly_repayment"] = text
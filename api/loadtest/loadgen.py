@@ -0,0 +1,215 @@
+"""Open-loop load generator for the Car Quiz API.
+
+Run from the api/ directory against an already running API:
+
+    python -m loadtest.loadgen --url http://127.0.0.1:8000 --rate 50 --duration 30
+
+Requests are issued at a fixed arrival rate regardless of how fast the
+server answers (so queueing shows up as latency, not as a lower send
+rate). Reports throughput, p50/p95/p99 latency and error rate per
+endpoint, optionally as JSON.
+"""
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+import httpx
+
+from benchmarks.synthetic import BODY_TYPES, BRANDS, MODELS, QUALITIES
+
+BUDGETS = ["Under $25k", "$25k-$35k", "$35k-$50k", "$50k-$70k", "$70k-$100k", "$100k+"]
+FUELS = ["Petrol, Diesel, or Hybrid (no plug-in)", "Electric (EV) or Plug-in Hybrid (PHEV)"]
+SEATS = ["Up to 5 is fine", "6+ seats"]
+TIMEFRAMES = ["Ready now", "Within 1 month", "1-3 months", "Just researching"]
+
+DEFAULT_MIX = "quiz=8,lead=1,search=1"
+
+
+def _quiz_answers() -> Dict:
+    return {
+        "body_type": random.choice(BODY_TYPES),
+        "budget_range": random.choice(BUDGETS),
+        "vehicle_quality": random.choice(QUALITIES),
+        "fuel_preference": random.choice(FUELS),
+        "seats_needed": random.choice(SEATS),
+        "timeframe": random.choice(TIMEFRAMES),
+    }
+
+
+def build_request(endpoint: str) -> Tuple[str, str, Optional[Dict]]:
+    """(method, path, json body) for one request to `endpoint`"""
+    if endpoint == "quiz":
+        return "POST", "/quiz/submit", _quiz_answers()
+    if endpoint == "lead":
+        return "POST", "/lead/capture", {
+            "customer_name": "Load Test",
+            "customer_email": "loadtest@example.com",
+            "customer_phone": "+61400000000",
+            "selected_cars": [{
+                "name": random.choice(MODELS),
+                "brand": random.choice(BRANDS),
+                "price_range": "$45,000-$55,000",
+                "match_percentage": 90,
+                "stock_level": "High",
+                "fuel_type": "Hybrid",
+                "body_type": "SUV",
+                "seats": "5",
+            }],
+            "quiz_answers": _quiz_answers(),
+        }
+    if endpoint == "search":
+        return "POST", "/cars/search", {
+            "make": random.choice(BRANDS),
+            "model": random.choice(MODELS)[:3],
+            "looking_for": "New",
+        }
+    if endpoint == "catalog":
+        return "GET", "/cars/catalog?fields=name,brand,price_range&limit=100", None
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        build_request(name.strip())  # validate the name
+        weights.append((name.strip(), float(weight or 1)))
+    return weights
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.dropped = 0
+
+    def record(self, endpoint: str, status: str, latency: float):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][status] += 1
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for endpoint, latencies in self.latencies.items():
+            latencies.sort()
+            statuses = dict(self.statuses[endpoint])
+            errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2),
+                "error_rate": round(errors / len(latencies), 4),
+                "statuses": statuses,
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "total_requests": total,
+            "throughput_rps": round(total / elapsed, 2),
+            "dropped": self.dropped,
+            "endpoints": endpoints,
+        }
+
+
+async def run_load(
+    url: str, rate: float, duration: float, mix: List[Tuple[str, float]],
+    max_in_flight: int, timeout: float,
+) -> Dict:
+    stats = Stats()
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    in_flight = 0
+    tasks = set()
+
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+
+        async def one_request(endpoint: str):
+            nonlocal in_flight
+            method, path, body = build_request(endpoint)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            finally:
+                in_flight -= 1
+            stats.record(endpoint, status, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        total = int(rate * duration)
+        for i in range(total):
+            # Fixed arrival schedule - never wait for responses before sending
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if in_flight >= max_in_flight:
+                stats.dropped += 1
+                continue
+            in_flight += 1
+            task = asyncio.create_task(one_request(random.choices(names, weights)[0]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    return stats.report(elapsed)
+
+
+def print_report(report: Dict):
+    print(
+        f"\n{report['total_requests']} requests in {report['elapsed_s']}s "
+        f"({report['throughput_rps']} req/s, {report['dropped']} dropped client-side)\n"
+    )
+    print(f"{'endpoint':<10} {'reqs':>6} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>8}  statuses")
+    for endpoint, s in sorted(report["endpoints"].items()):
+        print(
+            f"{endpoint:<10} {s['requests']:>6} {s['throughput_rps']:>8} {s['p50_ms']:>7}ms "
+            f"{s['p95_ms']:>7}ms {s['p99_ms']:>7}ms {s['error_rate']:>8.2%}  {s['statuses']}"
+        )
+
+
+def add_load_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--rate", type=float, default=20.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights, e.g. quiz=8,lead=1,search=1,catalog=1")
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Client timeout per request")
+    parser.add_argument("--output", help="Write the report JSON to this path")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    add_load_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(
+        args.url, args.rate, args.duration, parse_mix(args.mix), args.max_in_flight, args.timeout
+    ))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""End-to-end load test: stand-ins + API under uvicorn + load generator.
+
+Run from the api/ directory:
+
+    python -m loadtest.run --rate 50 --duration 30 --workers 2
+    python -m loadtest.run --openai-latency-ms 2000 --smtp-error-rate 0.2
+
+Starts the Airtable/OpenAI/SMTP stand-ins, launches `uvicorn main:app`
+pointed at them (emails that can't be sent land in a temporary outbox),
+waits for /health, drives traffic and prints a latency/throughput report.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from loadtest.loadgen import add_load_arguments, parse_mix, print_report, run_load
+from loadtest.stubs import add_fault_arguments, faults_from_args, start_stubs
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_for_health(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API did not become healthy within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100, help="Port for the API under test")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--airtable-port", type=int, default=8101)
+    parser.add_argument("--openai-port", type=int, default=8102)
+    parser.add_argument("--smtp-port", type=int, default=8125)
+    parser.add_argument("--api-log", help="Write API output here instead of discarding it")
+    add_fault_arguments(parser)
+    add_load_arguments(parser)
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    faults = faults_from_args(args)
+    env = start_stubs(
+        args.host, args.airtable_port, args.openai_port, args.smtp_port, args.catalog_size,
+        faults["airtable"], faults["openai"], faults["smtp"],
+    )
+    outbox_dir = tempfile.mkdtemp(prefix="car-quiz-loadtest-outbox-")
+    env.update({
+        "EMAIL_OUTBOX_DIR": outbox_dir,
+        "LEAD_EMAIL": "broker@example.com",
+        # Fresh shared catalog/cache per run so earlier runs can't warm this one
+        "SHARED_STATE_DIR": tempfile.mkdtemp(prefix="car-quiz-loadtest-shared-"),
+    })
+
+    api_log = open(args.api_log, "w") if args.api_log else subprocess.DEVNULL
+    url = f"http://{args.host}:{args.port}"
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", args.host, "--port", str(args.port),
+            "--workers", str(args.workers), "--no-access-log",
+        ],
+        cwd=API_DIR,
+        env={**os.environ, **env},
+        stdout=api_log,
+        stderr=subprocess.STDOUT,
+    )
+    try:
+        wait_for_health(url, process)
+        print(f"🚀 API up at {url} ({args.workers} worker(s)); {args.rate} req/s for {args.duration}s")
+        report = asyncio.run(run_load(url, args.rate, args.duration, mix, args.max_in_flight, args.timeout))
+        report["config"] = {
+            "workers": args.workers,
+            "rate": args.rate,
+            "duration": args.duration,
+            "mix": args.mix,
+            "catalog_size": args.catalog_size,
+            "faults": {name: vars(fault) for name, fault in faults.items()},
+        }
+        report["outboxed_emails"] = len(os.listdir(outbox_dir))
+        print_report(report)
+        print(f"\n📬 {report['outboxed_emails']} email(s) in outbox {outbox_dir}")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if args.api_log:
+            api_log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Local stand-ins for Airtable, OpenAI and Gmail SMTP with latency/error injection.
+
+Run from the api/ directory:
+
+    python -m loadtest.stubs --catalog-size 2000 --latency-ms 80 --error-rate 0.02
+
+Point the API at them with the environment printed on startup, or use
+loadtest.run which starts everything for you.
+"""
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+import argparse
+import asyncio
+import base64
+import json
+import random
+import re
+import threading
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import uvicorn
+
+from benchmarks.synthetic import make_airtable_record, make_catalog
+
+AIRTABLE_PAGE_SIZE = 100
+
+SEARCH_FORMULA = re.compile(r"SEARCH\(UPPER\('(?P<make>[^']*)'\).*SEARCH\(UPPER\('(?P<model>[^']*)'\)")
+BRAND_FORMULA = re.compile(r"\{Brand\} = '(?P<make>[^']*)'")
+
+
+@dataclass
+class Fault:
+    """Latency and error injection settings for one stand-in"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+    def delay(self) -> float:
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+
+# Airtable
+
+def _filter_records(records: List[Dict], formula: Optional[str]) -> List[Dict]:
+    """Understand just the formulas AirtableService sends; anything else returns all"""
+    if not formula:
+        return records
+    match = SEARCH_FORMULA.search(formula)
+    if match:
+        make, model = match["make"].upper(), match["model"].upper()
+        return [
+            r for r in records
+            if make in r["fields"]["Brand"].upper() and model in r["fields"]["Model"].upper()
+        ]
+    match = BRAND_FORMULA.search(formula)
+    if match:
+        return [r for r in records if r["fields"]["Brand"] == match["make"]]
+    return records
+
+
+def create_airtable_app(records: List[Dict], fault: Fault) -> FastAPI:
+    app = FastAPI(title="Airtable stand-in")
+
+    async def list_records(options: Dict) -> JSONResponse:
+        await asyncio.sleep(fault.delay())
+        if fault.should_fail():
+            return JSONResponse({"error": {"type": "SERVER_ERROR"}}, status_code=503)
+
+        matching = _filter_records(records, options.get("filterByFormula"))
+        max_records = options.get("maxRecords")
+        if max_records:
+            matching = matching[: int(max_records)]
+        page_size = min(int(options.get("pageSize") or AIRTABLE_PAGE_SIZE), AIRTABLE_PAGE_SIZE)
+        start = int(options.get("offset") or 0)
+        page = {"records": matching[start:start + page_size]}
+        if start + page_size < len(matching):
+            page["offset"] = str(start + page_size)
+        return JSONResponse(page)
+
+    @app.get("/v0/{base_id}/{table}")
+    async def list_records_get(base_id: str, table: str, request: Request):
+        return await list_records(dict(request.query_params))
+
+    @app.post("/v0/{base_id}/{table}/listRecords")
+    async def list_records_post(base_id: str, table: str, request: Request):
+        return await list_records(await request.json())
+
+    return app
+
+
+# OpenAI
+
+def create_openai_app(fault: Fault) -> FastAPI:
+    app = FastAPI(title="OpenAI stand-in")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(fault.delay())
+        if fault.should_fail():
+            return JSONResponse(
+                {"error": {"message": "Injected failure", "type": "server_error"}}, status_code=500
+            )
+        content = "These cars are a great fit for your budget and lifestyle (stub)."
+        if body.get("response_format", {}).get("type") == "json_object":
+            # Batched explanations: one entry per "### Customer N" section
+            prompt = body["messages"][-1]["content"]
+            customers = [int(number) for number in re.findall(r"^### Customer (\d+)$", prompt, re.MULTILINE)]
+            content = json.dumps({"explanations": [{"customer": number, "explanation": content} for number in customers]})
+        return {
+            "id": f"chatcmpl-stub{random.randrange(10**9)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": content,
+                },
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 150, "completion_tokens": 40, "total_tokens": 190},
+        }
+
+    return app
+
+
+# SMTP
+
+class SMTPStub:
+    """Minimal ESMTP server: EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, QUIT.
+
+    No STARTTLS - run the API with SMTP_STARTTLS=false against it.
+    """
+
+    def __init__(self, fault: Fault):
+        self.fault = fault
+        self.messages_received = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        async def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 smtp-stub ESMTP ready")
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                command = raw.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+
+                if verb == "EHLO":
+                    await reply("250-smtp-stub\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME")
+                elif verb == "HELO":
+                    await reply("250 smtp-stub")
+                elif verb == "AUTH":
+                    parts = command.split()
+                    if len(parts) >= 2 and parts[1].upper() == "LOGIN":
+                        await reply("334 " + base64.b64encode(b"Username:").decode())
+                        await reader.readline()
+                        await reply("334 " + base64.b64encode(b"Password:").decode())
+                        await reader.readline()
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        pass
+                    await asyncio.sleep(self.fault.delay())
+                    if self.fault.should_fail():
+                        await reply("451 4.3.0 Injected failure")
+                    else:
+                        self.messages_received += 1
+                        await reply("250 OK queued")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+# Runner
+
+def _run_http(app: FastAPI, host: str, port: int) -> threading.Thread:
+    config = uvicorn.Config(app, host=host, port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name=f"stub-{port}", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_stubs(
+    host: str,
+    airtable_port: int,
+    openai_port: int,
+    smtp_port: int,
+    catalog_size: int,
+    airtable_fault: Fault,
+    openai_fault: Fault,
+    smtp_fault: Fault,
+) -> Dict[str, str]:
+    """Start all three stand-ins on background threads; returns the API's env overrides"""
+    records = [make_airtable_record(car) for car in make_catalog(catalog_size)]
+    _run_http(create_airtable_app(records, airtable_fault), host, airtable_port)
+    _run_http(create_openai_app(openai_fault), host, openai_port)
+
+    smtp = SMTPStub(smtp_fault)
+    threading.Thread(
+        target=lambda: asyncio.run(smtp.serve(host, smtp_port)), name="stub-smtp", daemon=True
+    ).start()
+
+    return {
+        "AIRTABLE_ENDPOINT_URL": f"http://{host}:{airtable_port}",
+        "AIRTABLE_API_KEY": "stub-key",
+        "AIRTABLE_BASE_ID": "appStub",
+        "OPENAI_BASE_URL": f"http://{host}:{openai_port}/v1",
+        "OPENAI_API_KEY": "stub-key",
+        "SMTP_HOST": host,
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_STARTTLS": "false",
+        "SMTP_USERNAME": "stub@example.com",
+        "SMTP_PASSWORD": "stub",
+    }
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser):
+    """Shared CLI flags for latency and error injection"""
+    parser.add_argument("--catalog-size", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Default latency for every stand-in")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Default error rate (0-1)")
+    for name in ("airtable", "openai", "smtp"):
+        parser.add_argument(f"--{name}-latency-ms", type=float)
+        parser.add_argument(f"--{name}-error-rate", type=float)
+
+
+def faults_from_args(args) -> Dict[str, Fault]:
+    faults = {}
+    for name in ("airtable", "openai", "smtp"):
+        latency = getattr(args, f"{name}_latency_ms")
+        error_rate = getattr(args, f"{name}_error_rate")
+        faults[name] = Fault(
+            latency_ms=args.latency_ms if latency is None else latency,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate if error_rate is None else error_rate,
+        )
+    return faults
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--airtable-port", type=int, default=8101)
+    parser.add_argument("--openai-port", type=int, default=8102)
+    parser.add_argument("--smtp-port", type=int, default=8125)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    faults = faults_from_args(args)
+    env = start_stubs(
+        args.host, args.airtable_port, args.openai_port, args.smtp_port, args.catalog_size,
+        faults["airtable"], faults["openai"], faults["smtp"],
+    )
+    print("Stand-ins running. Start the API with:\n")
+    print(" ".join(f"{key}={value}" for key, value in env.items()) + " uvicorn main:app\n")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
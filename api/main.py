@@ -1,20 +1,32 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import List, Optional
 import logging
 
 from config import settings
 from models import (
     QuizSubmission, 
+    PartialQuizSubmission, 
     CarMatch, 
     LeadCapture, 
     CarSearchRequest, 
+    CarFilters,
+    FinanceEstimateRequest,
     APIResponse
 )
 from services import AirtableService, OpenAIService, EmailService
+from responses import CompressionMiddleware, api_response
+from catalog import parse_fields, stream_json, stream_ndjson
+from resilience import BulkheadFull
+from profiling import ServerTimingMiddleware, is_admin, load_profile
+from logs import RequestIDMiddleware, setup_logging
+from analytics import WINDOWS, QuizAnalytics
+from finance import resolve_terms
+import metrics
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging (JSON lines written off the event loop)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -32,19 +44,80 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id", "X-Next-Cursor", "X-Catalog-Version", "X-Total-Count", "X-Request-ID"],
 )
 
+# Request latency / in-flight metrics for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Server-Timing header on every response, plus admin-triggered profiling
+app.add_middleware(ServerTimingMiddleware)
+
+# Compress large JSON payloads (brotli when the client accepts it, else gzip)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+
+# Outermost, so every log line of a request carries its X-Request-ID
+app.add_middleware(RequestIDMiddleware)
+
+# Shed load instead of queueing when an upstream bulkhead is full
+@app.exception_handler(BulkheadFull)
+async def bulkhead_full_handler(request: Request, exc: BulkheadFull):
+    logger.warning(f"⚠️ Shedding {request.url.path}: {exc}")
+    return api_response(
+        message=f"Service busy, please retry in {exc.retry_after}s",
+        data={"dependency": exc.name},
+        success=False,
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Initialize services
 airtable_service = AirtableService()
 openai_service = OpenAIService()
 email_service = EmailService()
 
+# Quiz/lead analytics for /stats (events are written by a background thread)
+quiz_analytics = QuizAnalytics(
+    settings.analytics_dir, settings.analytics_flush_seconds, settings.analytics_checkpoint_seconds
+)
+quiz_analytics.start()
+
+@app.on_event("startup")
+async def start_background_tasks():
+    # Retry queued lead emails even when no new lead comes in
+    email_service.start_outbox_drain()
+
+# Upstream dependencies guarded by a circuit breaker and bulkhead
+UPSTREAMS = {
+    "airtable": airtable_service,
+    "openai": openai_service,
+    "email": email_service,
+}
+
+metrics.Gauge(
+    "carquiz_upstream_in_flight",
+    "Upstream calls currently running",
+    ["dependency"],
+    function=lambda: {(name,): s.bulkhead.in_flight for name, s in UPSTREAMS.items()},
+)
+metrics.Gauge(
+    "carquiz_upstream_queued",
+    "Calls waiting for an upstream bulkhead slot",
+    ["dependency"],
+    function=lambda: {(name,): s.bulkhead.waiting for name, s in UPSTREAMS.items()},
+)
+metrics.Gauge(
+    "carquiz_upstream_circuit_open",
+    "1 while the upstream's circuit breaker is open or half-open",
+    ["dependency"],
+    function=lambda: {(name,): int(s.breaker.state != "closed") for name, s in UPSTREAMS.items()},
+)
+
 # Root endpoint
 @app.get("/", response_model=APIResponse)
 async def root():
     """Root endpoint - API health check"""
-    return APIResponse(
-        success=True,
+    return api_response(
         message=f"🚗 {settings.app_name} is running!",
         data={"version": settings.version}
     )
@@ -52,13 +125,49 @@ async def root():
 # Health check endpoint
 @app.get("/health", response_model=APIResponse) 
 async def health_check():
-    """Health check endpoint"""
-    return APIResponse(
-        success=True,
-        message="API is healthy",
-        data={"status": "healthy", "services": ["airtable", "openai", "email"]}
+    """Health check endpoint - reports circuit breaker and bulkhead state per upstream"""
+    services = {
+        name: {**service.breaker.stats(), "bulkhead": service.bulkhead.stats()}
+        for name, service in UPSTREAMS.items()
+    }
+    degraded = [name for name, stats in services.items() if stats["state"] != "closed"]
+    
+    return api_response(
+        message=f"API is degraded: {', '.join(degraded)} unavailable" if degraded else "API is healthy",
+        data={"status": "degraded" if degraded else "healthy", "services": services}
+    )
+
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """Per-stage latency histograms, cache/fallback counters and in-flight gauges"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# Quiz analytics
+@app.get("/stats", response_model=APIResponse)
+async def get_stats(
+    window: str = Query("all", pattern=f"^(all|{'|'.join(WINDOWS)})$", description="all, hour, day or week"),
+    top: int = Query(5, ge=1, le=20, description="How many popular answers to return")
+):
+    """Quiz submissions, popular answers and quiz-to-lead conversion (all time or a rolling window)"""
+    stats = quiz_analytics.statistics(window, top)
+    return api_response(
+        message=f"Quiz statistics ({window})",
+        data=stats.model_dump()
     )
 
+# Stored request profiles (see profiling.ServerTimingMiddleware)
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse, include_in_schema=False)
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Folded-stack profile of a single request, ready for flamegraph.pl or speedscope"""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    
+    profile = load_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile)
+
 # Update the quiz submission endpoint
 @app.post("/quiz/submit", response_model=APIResponse)
 async def submit_quiz(quiz: QuizSubmission):
@@ -71,8 +180,10 @@ async def submit_quiz(quiz: QuizSubmission):
         
         if not matched_cars:
             raise HTTPException(status_code=404, detail="No matching cars found")
+        quiz_analytics.record_quiz(quiz)
         
-        # Convert to CarMatch objects
+        # Validate each match once against CarMatch; the dumped dicts are
+        # serialized directly without another pass through APIResponse
         car_matches = []
         for car in matched_cars:
             car_match = CarMatch(
@@ -84,30 +195,51 @@ async def submit_quiz(quiz: QuizSubmission):
                 fuel_type=car["fuel_type"],
                 body_type=car["body_type"],
                 seats=car["seats"],
-                image_url=car.get("image_url", "")
+                image_url=car.get("image_url", ""),
+                weekly_repayment=car.get("weekly_repayment")
             )
-            car_matches.append(car_match)
+            car_matches.append(car_match.model_dump())
         
         # Generate AI explanation
         explanation = await openai_service.generate_explanation(matched_cars, quiz)
         
         logger.info(f"Successfully matched {len(car_matches)} cars with AI explanation")
         
-        return APIResponse(
-            success=True,
+        return api_response(
             message="Quiz processed successfully with real data",
             data={
-                "matches": [match.dict() for match in car_matches],
+                "matches": car_matches,
                 "explanation": explanation,
                 "total_matches": len(car_matches),
                 "data_source": "airtable"
             }
         )
         
+    except BulkheadFull:
+        raise
     except Exception as e:
         logger.error(f"Error processing quiz: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/quiz/preview", response_model=APIResponse)
+async def preview_quiz(answers: PartialQuizSubmission):
+    """Live preview while the quiz is in progress: how many cars can still match, and the current top pick"""
+    snapshot = await airtable_service.get_snapshot()
+    with metrics.time_stage("preview"):
+        still_matching, top_pick = snapshot.preview_quiz(answers.model_dump(exclude_none=True))
+    answered = sum(1 for value in answers.model_dump().values() if value)
+
+    return api_response(
+        message=f"{still_matching} cars still match",
+        data={
+            "still_matching": still_matching,
+            "total_cars": len(snapshot),
+            "top_pick": top_pick,
+            "answered": answered,
+        },
+        headers={"X-Catalog-Version": str(snapshot.version)}
+    )
+
 # Car search endpoints
 @app.post("/cars/search", response_model=APIResponse)
 async def search_cars(search_request: CarSearchRequest):
@@ -138,8 +270,7 @@ async def search_cars(search_request: CarSearchRequest):
             }
             formatted_cars.append(formatted_car)
         
-        return APIResponse(
-            success=True,
+        return api_response(
             message=f"Found {len(formatted_cars)} results",
             data={
                 "cars": formatted_cars,
@@ -149,6 +280,8 @@ async def search_cars(search_request: CarSearchRequest):
             }
         )
         
+    except BulkheadFull:
+        raise
     except Exception as e:
         logger.error(f"Error searching cars: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -159,18 +292,19 @@ async def capture_lead(lead: LeadCapture):
     try:
         logger.info(f"Capturing lead: {lead.customer_name}")
         
-        # Send email
-        email_sent = await email_service.send_lead_email(lead)
+        # Send email; when SMTP is saturated or down it is queued in the outbox instead
+        email_status = await email_service.send_lead_email(lead)
         
-        if not email_sent:
+        if email_status == "failed":
             raise HTTPException(status_code=500, detail="Failed to send email")
+        quiz_analytics.record_lead()
         
-        return APIResponse(
-            success=True,
+        return api_response(
             message="Lead captured successfully",
             data={
                 "customer": lead.customer_name,
-                "email_sent": email_sent,
+                "email_sent": email_status == "sent",
+                "email_queued": email_status == "queued",
                 "cars_selected": len(lead.selected_cars)
             }
         )
@@ -185,24 +319,117 @@ async def test_get_cars():
     """Test endpoint to get all cars"""
     try:
         cars = await airtable_service.get_all_cars()
-        return APIResponse(
-            success=True,
+        return api_response(
             message=f"Retrieved {len(cars)} cars",
             data={"cars": cars}
         )
+    except BulkheadFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+@app.get("/cars/catalog")
+async def export_catalog(
+    format: str = Query("ndjson", pattern="^(ndjson|json)$", description="ndjson or json"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size (default: rest of catalog)")
+):
+    """Stream the catalog snapshot as NDJSON or chunked JSON with projection and cursor paging"""
+    try:
+        projection = parse_fields(fields)
+        snapshot = await airtable_service.get_snapshot()
+        start, stop = snapshot.page_bounds(cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    headers = {
+        "X-Catalog-Version": str(snapshot.version),
+        "X-Total-Count": str(len(snapshot)),
+    }
+    next_cursor = snapshot.next_cursor(stop)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    
+    if format == "ndjson":
+        body = stream_ndjson(snapshot, start, stop, projection)
+        media_type = "application/x-ndjson"
+    else:
+        body = stream_json(snapshot, start, stop, projection)
+        media_type = "application/json"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+@app.post("/cars/filter", response_model=APIResponse)
+async def filter_cars(
+    filters: CarFilters,
+    offset: int = Query(0, ge=0, description="Matches to skip"),
+    limit: int = Query(50, ge=1, le=200, description="Matches to return")
+):
+    """Filter the catalog with CarFilters; returns a page of matches plus live facet counts"""
+    snapshot = await airtable_service.get_snapshot()
+    with metrics.time_stage("filter"):
+        cars, total, facets = snapshot.filter(filters, offset, limit)
+
+    return api_response(
+        message=f"Found {total} matching cars",
+        data={"cars": cars, "total_matches": total, "facets": facets, "offset": offset, "limit": limit},
+        headers={"X-Catalog-Version": str(snapshot.version)}
+    )
+
+@app.get("/cars/{car_id}/similar", response_model=APIResponse)
+async def get_similar_cars(
+    car_id: str,
+    k: int = Query(5, ge=1, le=50, description="Number of similar cars to return")
+):
+    """"More like this": the k models closest by brand tier, body type, fuel, seats and price"""
+    snapshot = await airtable_service.get_snapshot()
+    with metrics.time_stage("similarity"):
+        similar = snapshot.similar(car_id, k)
+    if similar is None:
+        raise HTTPException(status_code=404, detail=f"Car not found: {car_id}")
+    car = snapshot.get(car_id)
+
+    return api_response(
+        message=f"Found {len(similar)} cars similar to {car['name']}",
+        data={"car": car, "similar": similar, "total_similar": len(similar)},
+        headers={"X-Catalog-Version": str(snapshot.version)}
+    )
+
+@app.post("/finance/estimate", response_model=APIResponse)
+async def estimate_finance(request: FinanceEstimateRequest):
+    """Weekly repayment estimates for several cars under custom terms (defaults fill in the rest)"""
+    terms = resolve_terms(request.deposit, request.deposit_percent, request.term_years, request.annual_rate)
+    snapshot = await airtable_service.get_snapshot()
+    with metrics.time_stage("finance"):
+        estimates, not_found = snapshot.finance_estimates(request.car_ids, terms)
+    deposit, deposit_percent, term_years, annual_rate = terms
+
+    return api_response(
+        message=f"Estimated repayments for {len(estimates)} cars",
+        data={
+            "estimates": estimates,
+            "not_found": not_found,
+            "terms": {
+                "deposit": deposit,
+                "deposit_percent": None if deposit is not None else deposit_percent,
+                "term_years": term_years,
+                "annual_rate": annual_rate,
+            },
+        },
+        headers={"X-Catalog-Version": str(snapshot.version)}
+    )
+
 @app.get("/cars/makes", response_model=APIResponse)
 async def get_car_makes():
     """Get all available car makes"""
     try:
         makes = await airtable_service.get_all_makes()
-        return APIResponse(
-            success=True,
+        return api_response(
             message=f"Found {len(makes)} car makes",
             data={"makes": makes}
         )
+    except BulkheadFull:
+        raise
     except Exception as e:
         logger.error(f"Error getting makes: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -212,11 +439,12 @@ async def get_car_models(make: str):
     """Get models for a specific make"""
     try:
         models = await airtable_service.get_models_by_make(make)
-        return APIResponse(
-            success=True,
+        return api_response(
             message=f"Found {len(models)} models for {make}",
             data={"models": models, "make": make}
         )
+    except BulkheadFull:
+        raise
     except Exception as e:
         logger.error(f"Error getting models for {make}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
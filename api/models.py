@@ -21,6 +21,15 @@ class QuizSubmission(BaseModel):
             }
         }
 
+class PartialQuizSubmission(BaseModel):
+    """Quiz answers so far for /quiz/preview - unanswered questions are left out"""
+    body_type: Optional[str] = Field(None, description="Car body type preference")
+    budget_range: Optional[str] = Field(None, description="Budget range (e.g., '$35k-$50k')")
+    seats_needed: Optional[str] = Field(None, description="Number of seats needed")
+    vehicle_quality: Optional[str] = Field(None, description="Quality level: Everyday, Premium, or Luxury")
+    fuel_preference: Optional[str] = Field(None, description="Fuel type preference")
+    timeframe: Optional[str] = Field(None, description="Purchase timeframe")
+
 class CarMatch(BaseModel):
     """Car match result model with all required fields"""
     name: str = Field(..., description="Car model name")
@@ -164,6 +173,16 @@ class QuizStatistics(BaseModel):
     popular_budget_ranges: List[str] = Field(..., description="Most popular budget ranges")
     popular_fuel_types: List[str] = Field(..., description="Most popular fuel preferences")
     conversion_rate: float = Field(..., description="Quiz to lead conversion rate")
+    total_leads: int = Field(0, description="Total lead captures")
+    window: str = Field("all", description="Time window: all, hour, day or week")
+
+class FinanceEstimateRequest(BaseModel):
+    """Finance terms for /finance/estimate - anything left out uses the configured defaults"""
+    car_ids: List[str] = Field(..., min_length=1, max_length=200, description="Catalog ids of the cars to estimate")
+    deposit: Optional[float] = Field(None, ge=0, description="Deposit in dollars (takes precedence over deposit_percent)")
+    deposit_percent: Optional[float] = Field(None, ge=0, le=100, description="Deposit as a percentage of the price")
+    term_years: Optional[int] = Field(None, ge=1, le=10, description="Loan term in years")
+    annual_rate: Optional[float] = Field(None, ge=0, le=30, description="Interest rate, % p.a.")
 
 class CarFilters(BaseModel):
     """Advanced car filtering options"""
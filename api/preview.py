@@ -0,0 +1,229 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+
+from config import settings
+from metrics import record_cache
+from scoring import (
+    MIN_GOOD_SCORE, answer_jitter, body_points, budget_points, fuel_points,
+    quality_penalty, quality_points, seats_points, timeframe_points,
+)
+
+# Questions in the order QuizPage asks them; cached prefixes follow this order
+QUESTIONS: Tuple[str, ...] = (
+    "body_type", "budget_range", "seats_needed", "vehicle_quality", "fuel_preference", "timeframe",
+)
+
+# question -> (points function, car fields the points depend on)
+BASE_POINTS: Dict[str, Tuple[Callable[[Dict, str], int], Tuple[str, ...]]] = {
+    "body_type": (body_points, ("body_type",)),
+    "budget_range": (budget_points, ("name",)),
+    "seats_needed": (seats_points, ("seats",)),
+    "vehicle_quality": (quality_points, ("brand",)),
+    "fuel_preference": (fuel_points, ("name", "fuel_type")),
+}
+BONUS_POINTS = {"timeframe": (timeframe_points, ("stock_level",))}
+
+# Most a single answer can add (see scoring.py), for the "still matching" bound
+MAX_POINTS = {
+    "body_type": 10, "budget_range": 20, "seats_needed": 10,
+    "vehicle_quality": 40, "fuel_preference": 30, "timeframe": 5,
+}
+MAX_JITTER = 7
+
+# Penalty masks remembered per quality answer (the quiz offers three)
+_PENALTY_CACHE_SIZE = 16
+
+Answers = Tuple[Tuple[str, str], ...]
+
+
+def _table(fn: Callable[[int], int]) -> bytes:
+    """256-entry bytes.translate table applying fn to every lane value"""
+    return bytes(min(max(fn(value), 0), 255) for value in range(256))
+
+
+@lru_cache(maxsize=None)
+def _offset(delta: int) -> bytes:
+    """Add delta to every lane, floored at 0"""
+    return _table(lambda value: value + delta)
+
+
+@lru_cache(maxsize=None)
+def _jitter(answer: int) -> bytes:
+    """Turn a car's hash lane into its jitter_points for an answer_jitter value"""
+    return _table(lambda value: (value + answer) % 8)
+
+
+@lru_cache(maxsize=None)
+def _at_least(threshold: int) -> bytes:
+    """1 in lanes >= threshold, 0 elsewhere"""
+    return _table(lambda value: 1 if value >= threshold else 0)
+
+
+_CLAMP = _table(lambda value: min(value, 100))
+
+
+class _Groups:
+    """Cars grouped by the fields a points function reads.
+
+    Points only have to be worked out once per group; `codes` holds each
+    car's group so a whole-catalog vector is one translate (or map) call.
+    """
+
+    def __init__(self, cars: Sequence[Dict], fields: Tuple[str, ...]):
+        if len(fields) == 1:
+            field = fields[0]
+            keys = map(lambda car: (car.get(field),), cars)
+        else:
+            keys = map(lambda car: tuple(map(car.get, fields)), cars)
+        ids: Dict[Tuple, int] = {}
+        codes = [ids.setdefault(key, len(ids)) for key in keys]
+        # A stand-in car per group; missing fields stay missing so .get() defaults still apply
+        self.representatives: List[Dict] = [
+            {field: value for field, value in zip(fields, key) if value is not None} for key in ids
+        ]
+        self.codes = bytes(codes) if len(ids) <= 256 else array("I", codes)
+
+    def vector(self, points: Callable[[Dict], int]) -> bytes:
+        """One byte per car holding points(car)"""
+        table = [points(car) for car in self.representatives]
+        if isinstance(self.codes, bytes):
+            return self.codes.translate(bytes(table + [0] * (256 - len(table))))
+        return bytes(map(table.__getitem__, self.codes))
+
+
+class QuizPreviewIndex:
+    """Scores partial quiz answers incrementally for /quiz/preview.
+
+    Scores are byte lanes (one per car) packed into a big int, so adding
+    an answer's contribution to every car is a single integer addition.
+    Partial sums are cached per answer prefix in QUESTIONS order; a new
+    answer therefore costs one vector addition on top of the cached
+    prefix instead of rescoring the catalog. With all six answers the
+    preview scores equal score_car exactly.
+
+    A car "still matches" while its best reachable score - current points
+    plus the most every unanswered question could add - is at least
+    MIN_GOOD_SCORE.
+    """
+
+    def __init__(self, cars: Sequence[Dict], cache_size: int = settings.quiz_preview_cache_size,
+                 cache_mb: int = settings.quiz_preview_cache_mb):
+        self.size = len(cars)
+        # Each entry holds two packed vectors of one byte per car; always keep
+        # room for one full quiz's prefixes
+        by_memory = cache_mb * 2**20 // max(2 * self.size, 1)
+        self.cache_size = max(len(QUESTIONS), min(cache_size, by_memory))
+        self._groups: Dict[Tuple[str, ...], _Groups] = {}
+        for _, fields in list(BASE_POINTS.values()) + list(BONUS_POINTS.values()):
+            if fields not in self._groups:
+                self._groups[fields] = _Groups(cars, fields)
+        # Each car's share of jitter_points, hashed once per snapshot
+        self._car_jitter = bytes(hash(car["id"]) % 8 for car in cars)
+        # answer prefix -> (base points, bonus points) as packed lanes
+        self._prefixes: "OrderedDict[Answers, Tuple[int, int]]" = OrderedDict()
+        self._penalties: Dict[str, List[Tuple[bytes, int]]] = {}
+
+    def _lanes(self, vector: bytes) -> int:
+        return int.from_bytes(vector, "little")
+
+    def _bytes(self, lanes: int) -> bytes:
+        return lanes.to_bytes(self.size, "little")
+
+    def _contribution(self, question: str, answer: str, answered: Dict[str, str]) -> Tuple[int, int]:
+        """(base, bonus) lanes one answer adds, given the answers before it"""
+        if question in BASE_POINTS:
+            points, fields = BASE_POINTS[question]
+            base = self._lanes(self._groups[fields].vector(lambda car: points(car, answer)))
+            bonus = 0
+        else:
+            points, fields = BONUS_POINTS[question]
+            base, bonus = 0, self._lanes(self._groups[fields].vector(lambda car: points(car, answer)))
+        # The random tie-breaker needs both budget and quality, so it lands with whichever comes second
+        if question in ("budget_range", "vehicle_quality"):
+            budget = answer if question == "budget_range" else answered.get("budget_range")
+            quality = answer if question == "vehicle_quality" else answered.get("vehicle_quality")
+            if budget is not None and quality is not None:
+                jitter = self._car_jitter.translate(_jitter(answer_jitter(budget, quality)))
+                bonus += self._lanes(jitter)
+        return base, bonus
+
+    def _partial(self, answers: Answers) -> Tuple[int, int]:
+        """Cached (base, bonus) lanes for `answers`, extending the longest cached prefix"""
+        cached = self._prefixes.get(answers)
+        if cached is not None:
+            self._prefixes.move_to_end(answers)
+            record_cache("quiz_preview", "hit")
+            return cached
+        record_cache("quiz_preview", "miss")
+
+        length = len(answers)
+        while length > 0 and answers[:length] not in self._prefixes:
+            length -= 1
+        base, bonus = self._prefixes[answers[:length]] if length else (0, 0)
+        answered = dict(answers[:length])
+        for question, answer in answers[length:]:
+            added_base, added_bonus = self._contribution(question, answer, answered)
+            base, bonus = base + added_base, bonus + added_bonus
+            answered[question] = answer
+            self._prefixes[tuple(answered.items())] = (base, bonus)
+            if len(self._prefixes) > self.cache_size:
+                self._prefixes.popitem(last=False)
+        return base, bonus
+
+    def _penalty_masks(self, quality: str) -> List[Tuple[bytes, int]]:
+        """(subtract table, lane mask) per penalty amount the quality answer hands out"""
+        masks = self._penalties.get(quality)
+        if masks is None:
+            groups = self._groups[BASE_POINTS["vehicle_quality"][1]]
+            penalties = groups.vector(lambda car: quality_penalty(car, quality))
+            amounts = {quality_penalty(car, quality) for car in groups.representatives} - {0}
+            masks = [
+                (
+                    _offset(-amount),
+                    self._lanes(penalties.translate(_table(lambda value: 255 if value == amount else 0))),
+                )
+                for amount in amounts
+            ]
+            if len(self._penalties) >= _PENALTY_CACHE_SIZE:
+                self._penalties.pop(next(iter(self._penalties)))
+            self._penalties[quality] = masks
+        return masks
+
+    def _penalized(self, base: int, quality: Optional[str]) -> int:
+        """Apply the quality-control penalty (floored at 0) lane by lane"""
+        if quality is None:
+            return base
+        lanes = self._bytes(base)
+        for subtract, selected in self._penalty_masks(quality):
+            base = (self._lanes(lanes.translate(subtract)) & selected) | (base & ~selected)
+        return base
+
+    def preview(self, answers: Dict[str, str]) -> Tuple[int, Optional[Tuple[int, int]]]:
+        """(cars still matching, (index, partial score) of the top pick or None)"""
+        key: Answers = tuple((question, answers[question]) for question in QUESTIONS if answers.get(question))
+        if self.size == 0:
+            return 0, None
+        base, bonus = self._partial(key)
+        answered = dict(key)
+        quality = answered.get("vehicle_quality")
+
+        scores = self._bytes(self._penalized(base, quality) + bonus).translate(_CLAMP)
+
+        # Best reachable score: every unanswered question at its maximum
+        remaining_base = sum(MAX_POINTS[question] for question in BASE_POINTS if question not in answered)
+        remaining_bonus = 0 if "timeframe" in answered else MAX_POINTS["timeframe"]
+        if "budget_range" not in answered or quality is None:
+            remaining_bonus += MAX_JITTER
+        ceiling = self._lanes(self._bytes(base).translate(_offset(remaining_base)))
+        ceiling = self._bytes(self._penalized(ceiling, quality) + bonus)
+        still_matching = ceiling.translate(_at_least(MIN_GOOD_SCORE - remaining_bonus)).count(1)
+
+        if not key:
+            return still_matching, None
+        # Highest score first found, i.e. ties go to catalog order as in top_matches
+        for score in range(100, -1, -1):
+            index = scores.find(score)
+            if index >= 0:
+                return still_matching, (index, score)
@@ -0,0 +1,178 @@
+from typing import Dict, Optional
+from collections import Counter
+from urllib.parse import parse_qs
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from config import settings
+from metrics import request_stage_timings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler producing folded stacks.
+
+    A background thread snapshots every thread's Python stack each
+    `interval` seconds via sys._current_frames(). The output is the
+    "folded" format (`thread;outer;...;inner count` per line) that
+    flamegraph.pl, speedscope and inferno read directly.
+
+    The event loop is shared, so samples of the loop thread also include
+    whatever other requests were doing at the time; profile under low
+    concurrency for the cleanest picture.
+    """
+
+    def __init__(self, interval: float, max_seconds: float):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        # ';' separates frames in the folded format; the count follows the last space
+        return label.replace(";", ":")
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval):
+            self._sample()
+            if time.monotonic() > deadline:
+                logger.warning("⏱️ Profiler hit max duration - stopping early")
+                break
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and return the folded stacks"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+
+# Only one profile at a time - sys._current_frames() walks every thread
+_profile_lock = threading.Lock()
+
+
+def _profile_path(profile_id: str) -> str:
+    return os.path.join(settings.profile_dir, f"{profile_id}.folded")
+
+
+def load_profile(profile_id: str) -> Optional[str]:
+    """Read a stored profile, or None if it doesn't exist"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    try:
+        with open(_profile_path(profile_id)) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """Check an admin token; admin features are disabled while ADMIN_TOKEN is unset"""
+    if not settings.admin_token or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.admin_token.encode())
+
+
+def _wants_profile(scope) -> bool:
+    """Admin asked to profile this request: the admin token in X-Profile, or
+    ?profile=1 together with the token in X-Admin-Token. The token is only
+    ever read from headers - query strings end up in access logs.
+    """
+    headers = dict(scope.get("headers", []))
+    if b"x-profile" in headers:
+        return is_admin(headers[b"x-profile"].decode("latin-1"))
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if query.get("profile") == ["1"] and b"x-admin-token" in headers:
+        return is_admin(headers[b"x-admin-token"].decode("latin-1"))
+    return False
+
+
+def _server_timing(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{stage};dur={elapsed * 1000:.2f}" for stage, elapsed in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """Adds a Server-Timing header with per-stage durations to every response.
+
+    Requests carrying the admin token in `X-Profile` (or `?profile=1` with
+    the token in `X-Admin-Token`) are also run under the sampling profiler. The profile is stored under
+    PROFILE_DIR and its id returned in `X-Profile-Id`; fetch it from
+    /admin/profiles/{id}.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        token = request_stage_timings.set(timings)
+
+        profiler = None
+        profile_id = None
+        if _wants_profile(scope) and _profile_lock.acquire(blocking=False):
+            profile_id = uuid.uuid4().hex
+            profiler = SamplingProfiler(settings.profile_interval, settings.profile_max_seconds)
+            profiler.start()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (b"server-timing", _server_timing(timings, time.perf_counter() - start).encode())
+                )
+                if profile_id:
+                    headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_stage_timings.reset(token)
+            if profiler is not None:
+                try:
+                    folded = profiler.stop()
+                    os.makedirs(settings.profile_dir, exist_ok=True)
+                    with open(_profile_path(profile_id), "w") as f:
+                        f.write(folded)
+                    logger.info(f"⏱️ Stored profile {profile_id} for {scope['path']}")
+                finally:
+                    _profile_lock.release()
@@ -0,0 +1,259 @@
+from typing import Any, Callable, Deque, Dict, Optional, Tuple, TypeVar
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import contextvars
+import functools
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BulkheadFull(Exception):
+    """Raised when an upstream's concurrency limit and wait queue are both exhausted"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is at capacity, retry in {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """Per-dependency concurrency limit with a bounded wait queue.
+
+    At most `max_concurrent` calls run at once; up to `max_queue` more wait
+    for at most `queue_timeout` seconds. Anything beyond that is rejected
+    immediately with BulkheadFull so callers can degrade instead of piling
+    up. Blocking calls run on the bulkhead's own thread pool, so a slow
+    dependency can't exhaust the event loop's default executor.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent, thread_name_prefix=f"bulkhead-{name}"
+        )
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.queue_timeout))
+
+    def _reject(self) -> BulkheadFull:
+        self.rejected += 1
+        logger.warning(f"⚠️ {self.name} bulkhead full ({self.in_flight} running, {self.waiting} waiting)")
+        return BulkheadFull(self.name, self.retry_after)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the bulkhead's concurrency slots for the duration of the block"""
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                raise self._reject()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._reject()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def run_in_executor(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking call on the bulkhead's own thread pool (caller holds a slot)"""
+        loop = asyncio.get_running_loop()
+        # Carry context vars (request id, stage timings) into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, fn, *args, **kwargs))
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking call on the bulkhead's executor once a slot is free"""
+        async with self.slot():
+            return await self.run_in_executor(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} circuit is open, retry in {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker over a rolling window of calls.
+
+    The breaker opens when, over the last `window_size` calls (and at least
+    `minimum_calls`), the error rate or the rate of calls slower than
+    `slow_call_seconds` reaches its threshold. While open every call fails
+    fast with CircuitOpen. After `open_seconds` it lets `half_open_calls`
+    probes through: if they all succeed it closes, any failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        slow_call_seconds: float,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        minimum_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 1,
+    ):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self.state = self.CLOSED
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def retry_after(self) -> int:
+        remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+        return max(1, math.ceil(remaining))
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"🔌 {self.name} circuit {self.state} -> {state}")
+            self.state = state
+
+    def _open(self):
+        self._transition(self.OPEN)
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def before_call(self):
+        """Decide whether a call may go through, raising CircuitOpen if not"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                raise CircuitOpen(self.name, self.retry_after)
+            self._transition(self.HALF_OPEN)
+            self._probes = 0
+            self._probe_successes = 0
+
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                raise CircuitOpen(self.name, self.retry_after)
+            self._probes += 1
+
+    def record(self, failed: bool, elapsed: float, slow_call_seconds: Optional[float] = None):
+        """Record the outcome and upstream latency of a call let through by before_call"""
+        slow = elapsed >= (slow_call_seconds or self.slow_call_seconds)
+
+        if self.state == self.OPEN:
+            # A call that started before the circuit opened
+            return
+
+        if self.state == self.HALF_OPEN:
+            if failed or slow:
+                self._open()
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._transition(self.CLOSED)
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append((failed, slow))
+        calls = len(self._outcomes)
+        if calls < self.minimum_calls:
+            return
+        failures = sum(1 for failed_call, _ in self._outcomes if failed_call)
+        slow_calls = sum(1 for _, slow_call in self._outcomes if slow_call)
+        if (
+            failures / calls >= self.failure_rate_threshold
+            or slow_calls / calls >= self.slow_call_rate_threshold
+        ):
+            self._open()
+
+    def release(self):
+        """Give back a half-open probe slot for a call whose outcome will never be recorded"""
+        if self.state == self.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        calls = len(self._outcomes)
+        failures = sum(1 for failed_call, _ in self._outcomes if failed_call)
+        return {
+            "state": self.state,
+            "recent_calls": calls,
+            "error_rate": round(failures / calls, 3) if calls else 0.0,
+            "last_error": self.last_error,
+        }
+
+
+async def call_upstream(
+    bulkhead: Bulkhead, breaker: CircuitBreaker, fn: Callable[..., T], *args: Any,
+    slow_call_seconds: Optional[float] = None, **kwargs: Any
+) -> T:
+    """Run a blocking upstream call through its circuit breaker and bulkhead.
+
+    The breaker is checked before queueing so an open circuit fails fast,
+    and only time spent in the upstream call (not the queue wait) counts
+    towards its latency threshold. Bulkhead rejections and cancelled calls
+    say nothing about the upstream's health and are not recorded.
+    `slow_call_seconds` overrides the breaker's threshold for calls that are
+    expected to take longer (e.g. batched requests).
+    """
+    breaker.before_call()
+    recorded = False
+    try:
+        async with bulkhead.slot():
+            start = time.monotonic()
+            try:
+                result = await bulkhead.run_in_executor(fn, *args, **kwargs)
+            except Exception as e:
+                breaker.last_error = str(e)[:200]
+                recorded = True
+                breaker.record(True, time.monotonic() - start, slow_call_seconds)
+                raise
+            recorded = True
+            breaker.record(False, time.monotonic() - start, slow_call_seconds)
+            return result
+    except BaseException:
+        # BulkheadFull or cancellation (e.g. client disconnect): nothing was learned
+        # about the upstream, but a half-open probe slot must be given back
+        if not recorded:
+            breaker.release()
+        raise
@@ -0,0 +1,168 @@
+from typing import Dict, Iterable, List
+import heapq
+
+from models import QuizSubmission
+
+# Define brand categories
+RELIABLE_BRANDS = frozenset(['Toyota', 'Honda', 'Mazda', 'Subaru', 'Hyundai', 'Kia', 'Nissan'])
+LUXURY_BRANDS = frozenset(['BMW', 'Mercedes-Benz', 'Audi', 'Lexus', 'Porsche', 'Jaguar', 'Land Rover', 'Volvo'])
+SUPERCAR_BRANDS = frozenset(['McLaren', 'Ferrari', 'Lamborghini', 'Bugatti', 'Koenigsegg', 'Aston Martin'])
+
+ELECTRIC_KEYWORDS = ['electric', 'ev', 'model', 'tesla', 'leaf', 'ioniq', 'bolt', 'e-tron']
+
+BUDGET_KEYWORDS = {
+    "under_35k": ["corolla", "yaris", "micra", "swift", "clio", "polo", "fiesta", "rio", "picanto"],
+    "35k_50k": ["camry", "mazda3", "civic", "golf", "i30", "elantra", "cerato"],
+    "50k_70k": ["rav4", "crv", "cx5", "tucson", "sportage", "outlander", "forester"],
+    "70k_100k": ["highlander", "cx9", "pilot", "pathfinder", "palisade", "carnival"],
+    "over_100k": ["lexus", "bmw", "mercedes", "audi", "porsche", "jaguar"]
+}
+
+# Matches below this score are only returned when nothing better exists
+MIN_GOOD_SCORE = 25
+
+
+def quality_points(car: Dict, vehicle_quality: str) -> int:
+    """1. Vehicle Quality Matching (40% of total score) - ORIGINAL"""
+    quality = vehicle_quality.lower()
+    if quality == "everyday":
+        if car['brand'] in RELIABLE_BRANDS:
+            return 40
+        elif car['brand'] not in LUXURY_BRANDS and car['brand'] not in SUPERCAR_BRANDS:
+            return 25
+    elif quality == "premium":
+        if car['brand'] in LUXURY_BRANDS:
+            return 40
+        elif car['brand'] in RELIABLE_BRANDS:
+            return 30
+    elif quality == "luxury":
+        if car['brand'] in LUXURY_BRANDS or car['brand'] in SUPERCAR_BRANDS:
+            return 40
+        else:
+            return 10
+    return 0
+
+
+def fuel_points(car: Dict, fuel_preference: str) -> int:
+    """2. Fuel Type Matching (30% of total score) - ORIGINAL"""
+    car_name_lower = car['name'].lower()
+    car_fuel_lower = car['fuel_type'].lower()
+    fuel = fuel_preference.lower()
+
+    if fuel == "hybrid":
+        if "hybrid" in car_name_lower or "prius" in car_name_lower:
+            return 30
+        elif "hybrid" in car_fuel_lower:
+            return 30
+        elif "petrol" in car_fuel_lower:
+            return 15  # Petrol cars can often have hybrid variants
+    elif fuel == "electric":
+        if any(keyword in car_name_lower for keyword in ELECTRIC_KEYWORDS):
+            return 30
+        elif "electric" in car_fuel_lower:
+            return 30
+    elif fuel == "petrol":
+        if "petrol" in car_fuel_lower or "gasoline" in car_fuel_lower:
+            return 30
+    elif fuel == "diesel":
+        if "diesel" in car_fuel_lower:
+            return 30
+    return 0
+
+
+def budget_points(car: Dict, budget_range: str) -> int:
+    """3. Budget Consideration (20% of total score) - ORIGINAL"""
+    car_name_lower = car['name'].lower()
+    budget_lower = budget_range.lower()
+    if any(x in budget_lower for x in ["25k", "35k", "entry", "first"]):
+        category = "under_35k"
+    elif any(x in budget_lower for x in ["35k", "50k", "value", "budget"]):
+        category = "35k_50k"
+    elif any(x in budget_lower for x in ["50k", "70k", "family", "spec"]):
+        category = "50k_70k"
+    elif any(x in budget_lower for x in ["70k", "100k", "luxury", "premium"]):
+        category = "70k_100k"
+    elif any(x in budget_lower for x in ["100k", "top", "performance", "prestige"]):
+        category = "over_100k"
+    else:
+        return 0
+    if any(keyword in car_name_lower for keyword in BUDGET_KEYWORDS[category]):
+        return 20
+    return 0
+
+
+def seats_points(car: Dict, seats_needed: str) -> int:
+    """4. Seats Matching (10% of total score) - ORIGINAL"""
+    return 10 if seats_needed in car.get('seats', '5') else 0
+
+
+def body_points(car: Dict, body_type: str) -> int:
+    """5. NEW: Body Type Matching (10 point bonus, no penalty for a mismatch)"""
+    car_body_type = car.get('body_type', '').lower().strip()
+    return 10 if car_body_type == body_type.lower().strip() else 0
+
+
+def quality_penalty(car: Dict, vehicle_quality: str) -> int:
+    """6. Penalty System (Quality Control) - ORIGINAL. Points taken off (score floors at 0)"""
+    quality = vehicle_quality.lower()
+    # Heavy penalty for supercars in non-luxury categories
+    if car['brand'] in SUPERCAR_BRANDS and quality != "luxury":
+        return 60
+    # Penalty for luxury cars in everyday category
+    if car['brand'] in LUXURY_BRANDS and quality == "everyday":
+        return 20
+    return 0
+
+
+def timeframe_points(car: Dict, timeframe: str) -> int:
+    """7. Timeframe consideration (bonus points) - ORIGINAL"""
+    if timeframe.lower() in ["ready now", "immediately", "asap"]:
+        if car['stock_level'].lower() in ["high", "available", "in stock"]:
+            return 5
+    return 0
+
+
+def answer_jitter(budget_range: str, vehicle_quality: str) -> int:
+    """The answers' share of jitter_points"""
+    return hash(budget_range + vehicle_quality) % 8
+
+
+def jitter_points(car: Dict, budget_range: str, vehicle_quality: str) -> int:
+    """8. Add controlled randomness to avoid identical results.
+
+    The car's and the answers' hashes are combined rather than hashing
+    them together, so /quiz/preview can hash each car once per snapshot.
+    """
+    return (hash(car['id']) + answer_jitter(budget_range, vehicle_quality)) % 8
+
+
+def score_car(car: Dict, quiz: QuizSubmission) -> int:
+    """Score one car (0-100) against the quiz answers"""
+    score = (
+        quality_points(car, quiz.vehicle_quality)
+        + fuel_points(car, quiz.fuel_preference)
+        + budget_points(car, quiz.budget_range)
+        + seats_points(car, quiz.seats_needed)
+        + body_points(car, quiz.body_type)
+    )
+    score = max(0, score - quality_penalty(car, quiz.vehicle_quality))
+    score += timeframe_points(car, quiz.timeframe)
+    score += jitter_points(car, quiz.budget_range, quiz.vehicle_quality)
+
+    # Keep score between 0-100
+    return min(max(score, 0), 100)
+
+
+def score_cars(cars: Iterable[Dict], quiz: QuizSubmission) -> List[Dict]:
+    """Score every car, returning copies with `match_score` set (snapshot records are shared)"""
+    return [{**car, 'match_score': score_car(car, quiz)} for car in cars]
+
+
+def top_matches(scored_cars: Iterable[Dict], k: int = 2) -> List[Dict]:
+    """Best `k` cars by match_score, ties kept in catalog order.
+
+    Scores below MIN_GOOD_SCORE are only used when there aren't k better
+    ones, which is exactly the top k overall - so a partial selection
+    (O(n log k)) replaces sorting the whole catalog.
+    """
+    return heapq.nlargest(k, scored_cars, key=lambda car: car['match_score'])
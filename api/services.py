@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 import logging
 from pyairtable import Api
 from openai import OpenAI
@@ -7,26 +7,75 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from models import CarMatch, QuizSubmission, LeadCapture
 from config import settings
+from catalog import CatalogSnapshot, search_make_model
+from finance import FinanceTable
+from scoring import score_cars, top_matches
+from metrics import record_cache, record_fallback, time_stage
+from resilience import Bulkhead, BulkheadFull, CircuitBreaker, CircuitOpen, call_upstream
+from batching import MicroBatcher
+from logs import SAMPLED
+from shared import open_shared_cache, open_shared_catalog
 import asyncio
+import json
+import os
+import time
+import uuid
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _fallback_reason(error: Exception) -> str:
+    """Metric label for why a fallback was used"""
+    return "circuit_open" if isinstance(error, CircuitOpen) else "busy"
+
+
+def _make_breaker(name: str, slow_call_seconds: float) -> CircuitBreaker:
+    """Circuit breaker for one upstream using the shared breaker settings"""
+    return CircuitBreaker(
+        name,
+        slow_call_seconds=slow_call_seconds,
+        failure_rate_threshold=settings.breaker_failure_rate,
+        slow_call_rate_threshold=settings.breaker_slow_call_rate,
+        window_size=settings.breaker_window_size,
+        minimum_calls=settings.breaker_minimum_calls,
+        open_seconds=settings.breaker_open_seconds,
+    )
+
+
 class AirtableService:
     """Service for Airtable API integration"""
     
     def __init__(self):
-        # Real API credentials from client
-        self.api_key = "pat1Qt72NlpjGSwu5.23012fbb3addbac3dabd07045a965223d2fd5dccd1416bd1c02661263eb34cc0"
-        self.base_id = "appGwBVE1xPvs6mZc"
+        # Real API credentials from client (AIRTABLE_API_KEY / AIRTABLE_BASE_ID override them)
+        self.api_key = settings.airtable_api_key or "pat1Qt72NlpjGSwu5.23012fbb3addbac3dabd07045a965223d2fd5dccd1416bd1c02661263eb34cc0"
+        self.base_id = settings.airtable_base_id or "appGwBVE1xPvs6mZc"
         
         # Initialize Airtable API
-        self.api = Api(self.api_key)
+        self.api = Api(
+            self.api_key,
+            timeout=(settings.airtable_connect_timeout, settings.airtable_timeout),
+            endpoint_url=settings.airtable_endpoint_url,
+        )
         self.models_table = None
         self.cars_table = None
         self.connection_working = False
         
+        # Catalog snapshot shared by all requests, refreshed every catalog_ttl_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._snapshot_lock = asyncio.Lock()
+        
+        # With several uvicorn workers, one refreshes and the rest read its snapshot
+        self.shared_catalog = open_shared_catalog(f"{settings.airtable_endpoint_url}/{self.base_id}")
+        self._shared_load_lock = asyncio.Lock()
+        
+        # Cap concurrent Airtable calls; blocking pyairtable calls run on its own pool
+        self.bulkhead = Bulkhead(
+            "airtable",
+            settings.airtable_max_concurrent,
+            settings.airtable_max_queue,
+            settings.airtable_queue_timeout,
+        )
+        self.breaker = _make_breaker("airtable", settings.airtable_slow_call_seconds)
+        
         # Try to connect to the real tables
         try:
             self._connect_to_tables()
@@ -49,7 +98,7 @@ class AirtableService:
         if isinstance(image_field, list) and len(image_field) > 0:
             first_attachment = image_field[0]
             if isinstance(first_attachment, dict) and 'url' in first_attachment:
-                logger.info(f"🖼️ Extracted image URL: {first_attachment['url'][:60]}...")
+                logger.debug("🖼️ Extracted image URL: %.60s...", first_attachment['url'], extra=SAMPLED)
                 return first_attachment['url']
         
         return ""
@@ -79,7 +128,7 @@ class AirtableService:
                         image_count += 1
                         brand = fields.get('Brand', 'Unknown')
                         model = fields.get('Model', 'Unknown')
-                        logger.info(f"🖼️ Found image for: {brand} {model}")
+                        logger.debug("🖼️ Found image for: %s %s", brand, model, extra=SAMPLED)
                 
                 logger.info(f"🎉 Found {image_count} records with images in first 50 records")
                 self.connection_working = True
@@ -90,105 +139,202 @@ class AirtableService:
             logger.error(f"❌ Failed to connect to tables: {e}")
             raise
     
-    async def get_all_cars(self) -> List[Dict]:
-        """Get all cars from Airtable Models table"""
+    def _record_to_car(self, record: Dict) -> Dict:
+        """Map an Airtable 'Models' record to the API's car dict"""
+        fields = record.get('fields', {})
+        
+        # Extract image URL properly
+        image_field = fields.get('Image Loading') or fields.get('Image')
+        image_url = self._extract_image_url(image_field)
+        
+        # Enhanced field mapping with better fallbacks
+        return {
+            "id": record.get('id'),
+            "name": fields.get('Model', 'Unknown Model'),
+            "brand": fields.get('Brand', 'Unknown Brand'),
+            "price_range": fields.get('Price Range', 'Contact for pricing'),
+            "fuel_type": fields.get('Fuel Type', 'Petrol'),  
+            "body_type": fields.get('Body Type', 'Car'),     
+            "seats": str(fields.get('Seats', '5')),          
+            "vehicle_quality": fields.get('Vehicle Quality', 'Everyday'),  
+            "stock_level": fields.get('Stock Level', 'Available'),         
+            "image_url": image_url,  # Already properly extracted
+            "weekly_repayment": fields.get('Weekly Repayment Estimate', 'Contact for quote'),
+            # ✅ NEW FIELDS ADDED:
+            "variants_in_range": fields.get('Variants In Range', 1),  # Default to 1 variant
+            "popular": fields.get('Popular', 'No')  # Default to 'No'
+        }
+    
+    async def get_snapshot(self) -> CatalogSnapshot:
+        """Get the current catalog snapshot, refreshing it once the TTL expires"""
+        snapshot = self._snapshot
+        if self.shared_catalog is not None and self.shared_catalog.changed():
+            snapshot = await self._load_shared_snapshot() or snapshot
+        if snapshot is not None and (
+            snapshot.age < settings.catalog_ttl_seconds or self._snapshot_lock.locked()
+        ):
+            # Fresh, or a refresh is already running - serve what we have
+            record_cache("catalog", "hit" if snapshot.age < settings.catalog_ttl_seconds else "stale")
+            return snapshot
+        
+        # Only the first load ever waits here, and no longer than a bulkhead queue would
+        try:
+            await asyncio.wait_for(self._snapshot_lock.acquire(), timeout=self.bulkhead.queue_timeout)
+        except asyncio.TimeoutError:
+            raise BulkheadFull("airtable", self.bulkhead.retry_after)
+        
+        try:
+            # Another request may have refreshed while we waited for the lock
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.age < settings.catalog_ttl_seconds:
+                record_cache("catalog", "hit")
+                return snapshot
+            
+            record_cache("catalog", "miss")
+            try:
+                with time_stage("catalog_load"):
+                    refreshed = await self._refresh_snapshot(snapshot)
+            except BulkheadFull:
+                if snapshot is None:
+                    raise
+                logger.warning("⚠️ Airtable busy - serving cached catalog")
+                record_fallback("airtable", "busy")
+                return snapshot
+            
+            if refreshed is not None:
+                self._snapshot = refreshed
+            elif snapshot is not None:
+                logger.warning("⚠️ Catalog refresh failed - keeping previous snapshot")
+                record_fallback("airtable", "stale_catalog")
+            else:
+                logger.warning("⚠️ Falling back to dummy data")
+                record_fallback("airtable", "dummy_catalog")
+                self._snapshot = CatalogSnapshot(self._get_dummy_cars(), source="dummy")
+            return self._snapshot
+        finally:
+            self._snapshot_lock.release()
+    
+    async def _load_shared_snapshot(self) -> Optional[CatalogSnapshot]:
+        """Adopt the snapshot another worker published, if it's newer than ours"""
+        async with self._shared_load_lock:
+            # Concurrent requests all saw the change; only the first decodes the file
+            if not self.shared_catalog.changed():
+                return self._snapshot
+            loaded = await asyncio.to_thread(self.shared_catalog.load)
+            if loaded is None:
+                return None
+            generation, age, cars = loaded
+            if self._snapshot is not None and self._snapshot.version >= generation:
+                return self._snapshot
+            # Sorting and index building for a big catalog would stall the event loop
+            self._snapshot = await asyncio.to_thread(CatalogSnapshot, cars, version=generation, age=age)
+            logger.info(f"📥 Loaded shared catalog generation {generation} ({len(cars)} cars)")
+            return self._snapshot
+    
+    async def _refresh_snapshot(self, snapshot: Optional[CatalogSnapshot]) -> Optional[CatalogSnapshot]:
+        """Fetch a new snapshot - or, with a shared catalog, let exactly one worker do it"""
+        shared = self.shared_catalog
+        if shared is None:
+            return await self._fetch_snapshot()
+        
+        if not shared.try_acquire_refresh():
+            # Another worker is refreshing: keep serving ours, or wait for its first publish
+            if snapshot is not None:
+                return snapshot
+            deadline = time.monotonic() + self.bulkhead.queue_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                if shared.changed():
+                    loaded = await self._load_shared_snapshot()
+                    if loaded is not None:
+                        return loaded
+            raise BulkheadFull("airtable", self.bulkhead.retry_after)
+        
+        try:
+            # It may have been published between our stat() and taking the lock
+            if shared.changed():
+                loaded = await self._load_shared_snapshot()
+                if loaded is not None and loaded.age < settings.catalog_ttl_seconds:
+                    return loaded
+            refreshed = await self._fetch_snapshot()
+            if refreshed is not None and refreshed.source == "airtable":
+                refreshed.version = await asyncio.to_thread(shared.publish, list(refreshed.cars))
+            return refreshed
+        finally:
+            shared.release_refresh()
+    
+    async def _fetch_snapshot(self) -> Optional[CatalogSnapshot]:
+        """Build a new snapshot from Airtable, or None if the fetch failed"""
         if not self.connection_working:
             logger.warning("⚠️ Using dummy data - Airtable connection not working")
-            return self._get_dummy_cars()
+            record_fallback("airtable", "dummy_catalog")
+            return CatalogSnapshot(self._get_dummy_cars(), source="dummy")
         
         try:
             logger.info("📋 Fetching all cars from 'Models' table...")
-            records = self.models_table.all()
+            records = await call_upstream(self.bulkhead, self.breaker, self.models_table.all)
             
             cars = []
             cars_with_images = 0
             
             for i, record in enumerate(records):
-                fields = record.get('fields', {})
-                
-                # Extract image URL properly
-                image_field = fields.get('Image Loading') or fields.get('Image')
-                image_url = self._extract_image_url(image_field)
-                
-                if image_url:
+                car_data = self._record_to_car(record)
+                if car_data["image_url"]:
                     cars_with_images += 1
-                
-                # Enhanced field mapping with better fallbacks
-                car_data = {
-                    "id": record.get('id'),
-                    "name": fields.get('Model', 'Unknown Model'),
-                    "brand": fields.get('Brand', 'Unknown Brand'),
-                    "price_range": fields.get('Price Range', 'Contact for pricing'),
-                    "fuel_type": fields.get('Fuel Type', 'Petrol'),  
-                    "body_type": fields.get('Body Type', 'Car'),     
-                    "seats": str(fields.get('Seats', '5')),          
-                    "vehicle_quality": fields.get('Vehicle Quality', 'Everyday'),  
-                    "stock_level": fields.get('Stock Level', 'Available'),         
-                    "image_url": image_url,  # Already properly extracted
-                    "weekly_repayment": fields.get('Weekly Repayment Estimate', 'Contact for quote'),
-                    # ✅ NEW FIELDS ADDED:
-                    "variants_in_range": fields.get('Variants In Range', 1),  # Default to 1 variant
-                    "popular": fields.get('Popular', 'No')  # Default to 'No'
-                }
                 cars.append(car_data)
-                
-                # Debug first few records
-                if i < 5:
-                    logger.info(f"🔍 Record {i+1}: {car_data['brand']} {car_data['name']} - Image: {'✅' if image_url else '❌'}")
+                logger.debug(
+                    "🔍 Record %d: %s %s - Image: %s", i + 1, car_data['brand'], car_data['name'],
+                    '✅' if car_data['image_url'] else '❌', extra=SAMPLED
+                )
             
-            logger.info(f"✅ Successfully fetched {len(cars)} cars from Airtable!")
-            logger.info(f"🖼️ {cars_with_images} cars have images")
-            return cars
+            logger.info(f"✅ Successfully fetched {len(cars)} cars from Airtable! ({cars_with_images} with images)")
+            return await asyncio.to_thread(CatalogSnapshot, cars)
             
+        except BulkheadFull:
+            raise
+        except CircuitOpen as e:
+            logger.warning(f"⚠️ {e} - skipping catalog refresh")
+            return None
         except Exception as e:
             logger.error(f"❌ Error fetching cars from Airtable: {e}")
-            logger.warning("⚠️ Falling back to dummy data")
-            return self._get_dummy_cars()
+            return None
+    
+    async def get_all_cars(self) -> List[Dict]:
+        """Get all cars from the catalog snapshot (Airtable Models table)"""
+        snapshot = await self.get_snapshot()
+        return list(snapshot.cars)
 
     
     async def search_cars_by_make_model(self, make: str, model: str) -> List[Dict]:
         """Search cars by make and model"""
         if not self.connection_working:
             logger.warning("⚠️ Using dummy search - Airtable connection not working")
-            return [car for car in self._get_dummy_cars() if make.lower() in car['brand'].lower()]
+            cars = [car for car in self._get_dummy_cars() if make.lower() in car['brand'].lower()]
+            FinanceTable(cars).apply(cars)
+            return cars
         
         try:
             logger.info(f"🔍 Searching for {make} {model} in 'Models' table...")
             
             # Use Airtable formula to search for brand and model
             formula = f"AND(SEARCH(UPPER('{make}'), UPPER({{Brand}})), SEARCH(UPPER('{model}'), UPPER({{Model}})))"
-            records = self.models_table.all(formula=formula)
+            try:
+                records = await call_upstream(self.bulkhead, self.breaker, self.models_table.all, formula=formula)
+            except (BulkheadFull, CircuitOpen) as e:
+                logger.warning(f"⚠️ {e} - searching the cached catalog instead")
+                record_fallback("airtable", _fallback_reason(e))
+                snapshot = await self.get_snapshot()
+                return search_make_model(snapshot.cars, make, model)
             
-            cars = []
-            for record in records:
-                fields = record.get('fields', {})
-                
-                # Extract image URL properly
-                image_field = fields.get('Image Loading') or fields.get('Image')
-                image_url = self._extract_image_url(image_field)
-                
-                # ✅ UPDATED: Include all new fields in search results too
-                car_data = {
-                    "id": record.get('id'),
-                    "name": fields.get('Model', 'Unknown Model'),
-                    "brand": fields.get('Brand', 'Unknown Brand'),
-                    "price_range": fields.get('Price Range', 'Contact for pricing'),
-                    "fuel_type": fields.get('Fuel Type', 'Petrol'),
-                    "body_type": fields.get('Body Type', 'Car'),
-                    "seats": str(fields.get('Seats', '5')),
-                    "vehicle_quality": fields.get('Vehicle Quality', 'Everyday'),
-                    "stock_level": fields.get('Stock Level', 'Available'),
-                    "image_url": image_url,
-                    "weekly_repayment": fields.get('Weekly Repayment Estimate', 'Contact for quote'),
-                    # ✅ NEW FIELDS ADDED:
-                    "variants_in_range": fields.get('Variants In Range', 1),
-                    "popular": fields.get('Popular', 'No')
-                }
-                cars.append(car_data)
+            # ✅ UPDATED: Include all new fields in search results too
+            cars = [self._record_to_car(record) for record in records]
+            FinanceTable(cars).apply(cars)
             
             logger.info(f"✅ Found {len(cars)} matching cars")
             return cars
             
+        except BulkheadFull:
+            raise
         except Exception as e:
             logger.error(f"❌ Error searching cars: {e}")
             return []
@@ -201,129 +347,16 @@ class AirtableService:
             if not all_cars:
                 return self._get_dummy_cars()[:2]
             
-            # Improved scoring algorithm
-            scored_cars = []
-            for car in all_cars:
-                score = 0
-                
-                # Define brand categories
-                reliable_brands = ['Toyota', 'Honda', 'Mazda', 'Subaru', 'Hyundai', 'Kia', 'Nissan']
-                luxury_brands = ['BMW', 'Mercedes-Benz', 'Audi', 'Lexus', 'Porsche', 'Jaguar', 'Land Rover', 'Volvo']
-                supercar_brands = ['McLaren', 'Ferrari', 'Lamborghini', 'Bugatti', 'Koenigsegg', 'Aston Martin']
-                
-                # 1. Vehicle Quality Matching (40% of total score) - ORIGINAL
-                if quiz.vehicle_quality.lower() == "everyday":
-                    if car['brand'] in reliable_brands:
-                        score += 40
-                    elif car['brand'] not in luxury_brands and car['brand'] not in supercar_brands:
-                        score += 25
-                elif quiz.vehicle_quality.lower() == "premium":
-                    if car['brand'] in luxury_brands:
-                        score += 40
-                    elif car['brand'] in reliable_brands:
-                        score += 30
-                elif quiz.vehicle_quality.lower() == "luxury":
-                    if car['brand'] in luxury_brands or car['brand'] in supercar_brands:
-                        score += 40
-                    else:
-                        score += 10
-                
-                # 2. Fuel Type Matching (30% of total score) - ORIGINAL
-                car_name_lower = car['name'].lower()
-                car_fuel_lower = car['fuel_type'].lower()
-                
-                if quiz.fuel_preference.lower() == "hybrid":
-                    if "hybrid" in car_name_lower or "prius" in car_name_lower:
-                        score += 30
-                    elif "hybrid" in car_fuel_lower:
-                        score += 30
-                    elif "petrol" in car_fuel_lower:
-                        score += 15  # Petrol cars can often have hybrid variants
-                elif quiz.fuel_preference.lower() == "electric":
-                    electric_keywords = ['electric', 'ev', 'model', 'tesla', 'leaf', 'ioniq', 'bolt', 'e-tron']
-                    if any(keyword in car_name_lower for keyword in electric_keywords):
-                        score += 30
-                    elif "electric" in car_fuel_lower:
-                        score += 30
-                elif quiz.fuel_preference.lower() == "petrol":
-                    if "petrol" in car_fuel_lower or "gasoline" in car_fuel_lower:
-                        score += 30
-                elif quiz.fuel_preference.lower() == "diesel":
-                    if "diesel" in car_fuel_lower:
-                        score += 30
-                
-                # 3. Budget Consideration (20% of total score) - ORIGINAL
-                budget_keywords = {
-                    "under_35k": ["corolla", "yaris", "micra", "swift", "clio", "polo", "fiesta", "rio", "picanto"],
-                    "35k_50k": ["camry", "mazda3", "civic", "golf", "i30", "elantra", "cerato"],
-                    "50k_70k": ["rav4", "crv", "cx5", "tucson", "sportage", "outlander", "forester"],
-                    "70k_100k": ["highlander", "cx9", "pilot", "pathfinder", "palisade", "carnival"],
-                    "over_100k": ["lexus", "bmw", "mercedes", "audi", "porsche", "jaguar"]
-                }
-                
-                budget_lower = quiz.budget_range.lower()
-                if any(x in budget_lower for x in ["25k", "35k", "entry", "first"]):
-                    if any(keyword in car_name_lower for keyword in budget_keywords["under_35k"]):
-                        score += 20
-                elif any(x in budget_lower for x in ["35k", "50k", "value", "budget"]):
-                    if any(keyword in car_name_lower for keyword in budget_keywords["35k_50k"]):
-                        score += 20
-                elif any(x in budget_lower for x in ["50k", "70k", "family", "spec"]):
-                    if any(keyword in car_name_lower for keyword in budget_keywords["50k_70k"]):
-                        score += 20
-                elif any(x in budget_lower for x in ["70k", "100k", "luxury", "premium"]):
-                    if any(keyword in car_name_lower for keyword in budget_keywords["70k_100k"]):
-                        score += 20
-                elif any(x in budget_lower for x in ["100k", "top", "performance", "prestige"]):
-                    if any(keyword in car_name_lower for keyword in budget_keywords["over_100k"]):
-                        score += 20
-                
-                # 4. Seats Matching (10% of total score) - ORIGINAL
-                if quiz.seats_needed in car.get('seats', '5'):
-                    score += 10
-                
-                # 5. NEW: Body Type Matching (10 point bonus)
-                car_body_type = car.get('body_type', '').lower().strip()
-                quiz_body_type = quiz.body_type.lower().strip()
-                
-                if car_body_type == quiz_body_type:
-                    score += 10  # Perfect body type match gets 10 bonus points
-                # No penalty for mismatch - just no bonus
-                
-                # 6. Penalty System (Quality Control) - ORIGINAL
-                # Heavy penalty for supercars in non-luxury categories
-                if car['brand'] in supercar_brands and quiz.vehicle_quality.lower() != "luxury":
-                    score = max(0, score - 60)
-                
-                # Penalty for luxury cars in everyday category
-                if car['brand'] in luxury_brands and quiz.vehicle_quality.lower() == "everyday":
-                    score = max(0, score - 20)
-                
-                # 7. Timeframe consideration (bonus points) - ORIGINAL
-                if quiz.timeframe.lower() in ["ready now", "immediately", "asap"]:
-                    if car['stock_level'].lower() in ["high", "available", "in stock"]:
-                        score += 5
-                
-                # 8. Add controlled randomness to avoid identical results - ORIGINAL
-                score += (hash(car['id'] + quiz.budget_range + quiz.vehicle_quality) % 8)
-                
-                # Keep score between 0-100
-                car['match_score'] = min(max(score, 0), 100)
-                scored_cars.append(car)
-            
-            # Sort by score and return top matches
-            sorted_cars = sorted(scored_cars, key=lambda x: x['match_score'], reverse=True)
-            
-            # Filter out very low scores (below 25) unless we don't have enough good matches
-            good_matches = [car for car in sorted_cars if car['match_score'] >= 25]
-            if len(good_matches) >= 2:
-                matched_cars = good_matches[:2]
-            else:
-                matched_cars = sorted_cars[:2]  # Take best available even if low score
+            with time_stage("scoring"):
+                # Improved scoring algorithm (see scoring.py)
+                scored_cars = score_cars(all_cars, quiz)
+                matched_cars = top_matches(scored_cars, k=2)
             
             logger.info(f"✅ Matched {len(matched_cars)} cars with scores: {[c['match_score'] for c in matched_cars]}")
             return matched_cars
             
+        except BulkheadFull:
+            raise
         except Exception as e:
             logger.error(f"❌ Error matching cars: {e}")
             return self._get_dummy_cars()[:2]
@@ -392,7 +425,13 @@ class AirtableService:
         
         try:
             logger.info("🔍 Fetching all car makes from Airtable...")
-            records = self.models_table.all()
+            try:
+                records = await call_upstream(self.bulkhead, self.breaker, self.models_table.all)
+            except (BulkheadFull, CircuitOpen) as e:
+                logger.warning(f"⚠️ {e} - listing makes from the cached catalog")
+                record_fallback("airtable", _fallback_reason(e))
+                snapshot = await self.get_snapshot()
+                return sorted({car['brand'].strip() for car in snapshot.cars if car['brand'].strip()})
             makes = set()
             
             for record in records:
@@ -404,6 +443,8 @@ class AirtableService:
             logger.info(f"✅ Found {len(makes_list)} unique makes: {makes_list[:5]}{'...' if len(makes_list) > 5 else ''}")
             return makes_list
             
+        except BulkheadFull:
+            raise
         except Exception as e:
             logger.error(f"❌ Error fetching makes: {e}")
             return ['Toyota', 'BMW', 'Mercedes-Benz', 'Audi', 'Nissan']
@@ -423,7 +464,13 @@ class AirtableService:
         try:
             logger.info(f"🔍 Fetching models for make: {make}")
             formula = f"{{Brand}} = '{make}'"
-            records = self.models_table.all(formula=formula)
+            try:
+                records = await call_upstream(self.bulkhead, self.breaker, self.models_table.all, formula=formula)
+            except (BulkheadFull, CircuitOpen) as e:
+                logger.warning(f"⚠️ {e} - listing {make} models from the cached catalog")
+                record_fallback("airtable", _fallback_reason(e))
+                snapshot = await self.get_snapshot()
+                return sorted({car['name'].strip() for car in snapshot.cars if car['brand'] == make and car['name'].strip()})
             models = set()
             
             for record in records:
@@ -432,20 +479,154 @@ class AirtableService:
                     models.add(model)
             
             models_list = sorted(list(models))
-            logger.info(f"✅ Found {len(models_list)} models for {make}: {models_list}")
+            logger.info(f"✅ Found {len(models_list)} models for {make}")
+            logger.debug("Models for %s: %s", make, models_list)
             return models_list
             
+        except BulkheadFull:
+            raise
         except Exception as e:
             logger.error(f"❌ Error fetching models for {make}: {e}")
             return []
 
 
+EXPLANATION_MODEL = "gpt-4o-mini"
+EXPLANATION_SYSTEM_PROMPT = "You are a helpful car expert who explains car recommendations in a friendly, conversational way."
+EXPLANATION_MAX_TOKENS = 150
+
+BATCH_PROMPT = """
+Write explanations for {count} different customers. Each customer's request is below under its own "### Customer N" heading; follow each one's instructions separately.
+
+{requests}
+
+Reply with a JSON object of the form {{"explanations": [{{"customer": 1, "explanation": "..."}}]}} with exactly one entry per customer.
+"""
+
+
+class BatchItemMissing(Exception):
+    """A batched OpenAI reply had no usable explanation for this item"""
+
+
+def _parse_batch_reply(content: str, count: int) -> Dict[int, str]:
+    """Explanations by item position from a batch reply; malformed entries are skipped"""
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return {}
+    items = data.get("explanations") if isinstance(data, dict) else None
+    explanations = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        number, text = item.get("customer"), item.get("explanation")
+        if isinstance(number, int) and 1 <= number <= count and isinstance(text, str) and text.strip():
+            explanations[number - 1] = text.strip()
+    return explanations
+
+
 class OpenAIService:
     """Service for OpenAI API integration"""
     
     def __init__(self):
         self.api_key = settings.openai_api_key
-        logger.info("🤖 OpenAIService initialized")
+        self._client = None
+        self.bulkhead = Bulkhead(
+            "openai",
+            settings.openai_max_concurrent,
+            settings.openai_max_queue,
+            settings.openai_queue_timeout,
+        )
+        self.breaker = _make_breaker("openai", settings.openai_slow_call_seconds)
+        # Explanations are shared by all workers (same quiz + matches -> same prompt)
+        self.cache = open_shared_cache()
+        # Optional micro-batching of concurrent explanations into one call
+        self.batcher: Optional[MicroBatcher[str, str]] = None
+        if settings.explanation_batch_window_ms > 0 and settings.explanation_batch_max_size > 1:
+            self.batcher = MicroBatcher(
+                "openai_explanation",
+                self._complete_batch,
+                settings.explanation_batch_window_ms / 1000,
+                settings.explanation_batch_max_size,
+            )
+        logger.info(f"🤖 OpenAIService initialized (batching {'on' if self.batcher else 'off'})")
+    
+    def _get_client(self) -> OpenAI:
+        """Create the OpenAI client once and reuse its connection pool"""
+        if self._client is None:
+            self._client = OpenAI(
+                api_key=self.api_key,
+                base_url=settings.openai_base_url or None,
+                timeout=settings.openai_timeout,
+                max_retries=0,
+            )
+        return self._client
+    
+    async def _complete(self, prompt: str) -> str:
+        """One explanation from one prompt"""
+        # OpenAI v1.0+ syntax - runs on the OpenAI bulkhead's thread pool
+        client = self._get_client()
+        response = await call_upstream(
+            self.bulkhead,
+            self.breaker,
+            client.chat.completions.create,
+            model=EXPLANATION_MODEL,
+            messages=[
+                {"role": "system", "content": EXPLANATION_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=EXPLANATION_MAX_TOKENS,
+            temperature=0.7
+        )
+        return response.choices[0].message.content.strip()
+    
+    async def _complete_batch(self, prompts: List[str]) -> List[Union[str, Exception]]:
+        """Explanations for several prompts from one structured (JSON) completion"""
+        # Identical quizzes in the same burst share one item
+        unique = list(dict.fromkeys(prompts))
+        if len(unique) < len(prompts):
+            results = await self._complete_batch(unique)
+            by_prompt = dict(zip(unique, results))
+            return [by_prompt[prompt] for prompt in prompts]
+        if len(prompts) == 1:
+            return [await self._complete(prompts[0])]
+        
+        requests = "\n\n".join(f"### Customer {number}\n{prompt.strip()}" for number, prompt in enumerate(prompts, 1))
+        # Generation time grows with the tokens asked for, so a batch of n gets n times
+        # the single-call timeout and slow-call threshold instead of tripping the breaker
+        client = self._get_client().with_options(timeout=settings.openai_timeout * len(prompts))
+        response = await call_upstream(
+            self.bulkhead,
+            self.breaker,
+            client.chat.completions.create,
+            slow_call_seconds=settings.openai_slow_call_seconds * len(prompts),
+            model=EXPLANATION_MODEL,
+            messages=[
+                {"role": "system", "content": EXPLANATION_SYSTEM_PROMPT},
+                {"role": "user", "content": BATCH_PROMPT.format(count=len(prompts), requests=requests)}
+            ],
+            max_tokens=EXPLANATION_MAX_TOKENS * len(prompts),
+            temperature=0.7,
+            response_format={"type": "json_object"}
+        )
+        explanations = _parse_batch_reply(response.choices[0].message.content, len(prompts))
+        logger.info(f"✅ Batched AI explanations: {len(explanations)}/{len(prompts)} parsed")
+        
+        missing = [index for index in range(len(prompts)) if index not in explanations]
+        results: List[Union[str, Exception]] = [explanations.get(index) for index in range(len(prompts))]
+        if missing and settings.explanation_batch_fallback == "single":
+            logger.warning(f"⚠️ {len(missing)} explanation(s) missing from batch reply - requesting them one by one")
+            retried = await asyncio.gather(*(self._complete(prompts[index]) for index in missing), return_exceptions=True)
+            for index, result in zip(missing, retried):
+                results[index] = result
+        else:
+            for index in missing:
+                results[index] = BatchItemMissing(f"Explanation {index + 1} of {len(prompts)} missing from batch reply")
+        return results
+    
+    def _template_explanation(self, cars: List[Dict], quiz_answers: QuizSubmission) -> str:
+        """Template explanation used whenever the AI explanation is unavailable"""
+        car_names = [car['name'] for car in cars]
+        return f"Based on your preferences for {quiz_answers.vehicle_quality} quality and {quiz_answers.fuel_preference} fuel type, we've selected {', '.join(car_names)} as excellent matches for your budget of {quiz_answers.budget_range}. These vehicles offer great value, reliability, and will meet your specific needs perfectly!"
     
     async def generate_explanation(self, cars: List[Dict], quiz_answers: QuizSubmission) -> str:
         """Generate AI explanation for car matches using OpenAI v1.0+ API"""
@@ -475,28 +656,44 @@ Write a friendly, conversational 2-3 sentence explanation that:
 Be enthusiastic but professional, like a knowledgeable friend giving advice.
 """
 
-            # OpenAI v1.0+ syntax
-            client = OpenAI(api_key=self.api_key)
-            
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a helpful car expert who explains car recommendations in a friendly, conversational way."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=150,
-                temperature=0.7
-            )
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.make_key("explanation", EXPLANATION_MODEL, prompt)
+                cached = await asyncio.to_thread(self.cache.get, cache_key)
+                record_cache("explanation", "hit" if cached is not None else "miss")
+                if cached is not None:
+                    return cached
+            
+            with time_stage("openai_explanation"):
+                if self.batcher is not None:
+                    explanation = await self.batcher.submit(prompt)
+                else:
+                    explanation = await self._complete(prompt)
             
-            explanation = response.choices[0].message.content.strip()
             logger.info("✅ Generated AI explanation successfully")
+            if cache_key is not None:
+                await asyncio.to_thread(self.cache.set, cache_key, explanation, settings.explanation_cache_ttl_seconds)
             return explanation
             
+        except (BulkheadFull, CircuitOpen) as e:
+            logger.warning(f"⚠️ {e} - using template explanation")
+            record_fallback("openai", _fallback_reason(e))
+            return self._template_explanation(cars, quiz_answers)
+        except BatchItemMissing as e:
+            logger.warning(f"⚠️ {e} - using template explanation")
+            record_fallback("openai", "batch_incomplete")
+            return self._template_explanation(cars, quiz_answers)
         except Exception as e:
             logger.error(f"❌ Error generating AI explanation: {e}")
+            record_fallback("openai", "error")
             # Enhanced fallback explanation
-            car_names = [car['name'] for car in cars]
-            return f"Based on your preferences for {quiz_answers.vehicle_quality} quality and {quiz_answers.fuel_preference} fuel type, we've selected {', '.join(car_names)} as excellent matches for your budget of {quiz_answers.budget_range}. These vehicles offer great value, reliability, and will meet your specific needs perfectly!"
+            return self._template_explanation(cars, quiz_answers)
+
+
+# Outbox messages being delivered are renamed to "<name>.<pid>-<claim time ns>.sending";
+# a claim older than the timeout belongs to a worker that died mid-send and is released
+OUTBOX_CLAIM_SUFFIX = ".sending"
+OUTBOX_CLAIM_TIMEOUT_SECONDS = 600
 
 
 class EmailService:
@@ -504,10 +701,27 @@ class EmailService:
     
     def __init__(self):
         self.lead_email = settings.lead_email
+        self.outbox_dir = settings.email_outbox_dir
+        self._flushing_outbox = False
+        # Strong references to background outbox tasks so they aren't garbage collected
+        self._outbox_tasks: set = set()
+        # Outbox claims this process is delivering right now
+        self._claims: set = set()
+        self.bulkhead = Bulkhead(
+            "smtp",
+            settings.smtp_max_concurrent,
+            settings.smtp_max_queue,
+            settings.smtp_queue_timeout,
+        )
+        self.breaker = _make_breaker("smtp", settings.smtp_slow_call_seconds)
         logger.info(f"📧 EmailService initialized - sending to: {self.lead_email}")
     
-    async def send_lead_email(self, lead_data: LeadCapture) -> bool:
-        """Send lead capture email via Gmail SMTP"""
+    async def send_lead_email(self, lead_data: LeadCapture) -> str:
+        """Send lead capture email via Gmail SMTP.
+
+        Returns "sent" once delivered, "queued" when it went to the outbox
+        (SMTP saturated or down) and "failed" otherwise.
+        """
         try:
             # Format subject line
             car_info = f"{lead_data.selected_cars[0].name}" if lead_data.selected_cars else "Car Quiz Lead"
@@ -560,42 +774,175 @@ Time: {lead_data.created_at if hasattr(lead_data, 'created_at') else 'Now'}
 """
             
             # Send actual email via SMTP
-            await self._send_smtp_email(subject, email_body, self.lead_email)
+            if not await self._send_smtp_email(subject, email_body, self.lead_email):
+                return "queued"
             
             logger.info(f"✅ Email sent successfully to {self.lead_email}")
-            return True
+            return "sent"
             
         except Exception as e:
             logger.error(f"❌ Error sending lead email: {e}")
+            return "failed"
+    
+    def _deliver_smtp(self, subject: str, body: str, to_email: str):
+        """Blocking SMTP send - always called on the SMTP bulkhead's thread pool"""
+        try:
+            # Create message
+            msg = MIMEMultipart()
+            msg['From'] = settings.smtp_username
+            msg['To'] = to_email
+            msg['Subject'] = subject
+            
+            # Add body
+            msg.attach(MIMEText(body, 'plain'))
+            
+            # Send via Gmail SMTP
+            server = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout)
+            if settings.smtp_starttls:
+                server.starttls()
+            server.login(settings.smtp_username, settings.smtp_password)
+            text = msg.as_string()
+            server.sendmail(settings.smtp_username, to_email, text)
+            server.quit()
+            
+            logger.info("📧 Email sent via SMTP successfully")
+            
+        except Exception as e:
+            logger.error(f"❌ SMTP Error: {e}")
+            raise e
+    
+    async def _send_smtp_email(self, subject: str, body: str, to_email: str) -> bool:
+        """Send email via Gmail SMTP, or queue it in the outbox when SMTP is saturated or down.
+
+        Returns True if it was delivered, False if it was queued.
+        """
+        try:
+            with time_stage("smtp_send"):
+                await call_upstream(self.bulkhead, self.breaker, self._deliver_smtp, subject, body, to_email)
+        except (BulkheadFull, CircuitOpen) as e:
+            self._outbox_email(subject, body, to_email, reason=str(e))
+            record_fallback("smtp", _fallback_reason(e))
             return False
+        
+        # SMTP has capacity again - drain anything queued while it was busy
+        self._start_outbox_flush()
+        return True
+    
+    def _start_outbox_flush(self):
+        """Start a background flush unless one is already running in this worker"""
+        if self._flushing_outbox or not self._outbox_files():
+            return
+        # Set before the task runs so concurrent sends can't start a second flush
+        self._flushing_outbox = True
+        task = asyncio.create_task(self.flush_outbox())
+        self._outbox_tasks.add(task)
+        task.add_done_callback(self._outbox_tasks.discard)
     
-    async def _send_smtp_email(self, subject: str, body: str, to_email: str):
-        """Send email via Gmail SMTP"""
-        def send_email():
+    async def _drain_outbox_periodically(self):
+        """Retry the outbox on a timer, so queued leads don't wait for the next successful send"""
+        while True:
+            await asyncio.sleep(settings.email_outbox_drain_seconds)
             try:
-                # Create message
-                msg = MIMEMultipart()
-                msg['From'] = settings.smtp_username
-                msg['To'] = to_email
-                msg['Subject'] = subject
-                
-                # Add body
-                msg.attach(MIMEText(body, 'plain'))
-                
-                # Send via Gmail SMTP
-                server = smtplib.SMTP(settings.smtp_host, settings.smtp_port)
-                server.starttls()
-                server.login(settings.smtp_username, settings.smtp_password)
-                text = msg.as_string()
-                server.sendmail(settings.smtp_username, to_email, text)
-                server.quit()
-                
-                logger.info("📧 Email sent via SMTP successfully")
-                
+                self._release_stale_claims()
+                self._start_outbox_flush()
             except Exception as e:
-                logger.error(f"❌ SMTP Error: {e}")
-                raise e
-        
-        # Run in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, send_email)
\ No newline at end of file
+                logger.error(f"❌ Outbox drain failed: {e}")
+    
+    def start_outbox_drain(self):
+        """Start the periodic outbox drain (call from the running event loop)"""
+        if settings.email_outbox_drain_seconds > 0:
+            task = asyncio.create_task(self._drain_outbox_periodically())
+            self._outbox_tasks.add(task)
+            task.add_done_callback(self._outbox_tasks.discard)
+    
+    def _release_stale_claims(self):
+        """Put back messages whose sender died mid-delivery (claims older than OUTBOX_CLAIM_TIMEOUT_SECONDS)"""
+        try:
+            names = os.listdir(self.outbox_dir)
+        except FileNotFoundError:
+            return
+        cutoff = time.time_ns() - OUTBOX_CLAIM_TIMEOUT_SECONDS * 1_000_000_000
+        for name in names:
+            if not name.endswith(OUTBOX_CLAIM_SUFFIX):
+                continue
+            claimed = os.path.join(self.outbox_dir, name)
+            if claimed in self._claims:
+                continue
+            # The claim time is in the name: a rename keeps the message's own (older) mtime
+            original, _, owner = name[:-len(OUTBOX_CLAIM_SUFFIX)].rpartition('.')
+            try:
+                claimed_at = int(owner.rpartition('-')[2])
+            except ValueError:
+                continue
+            if claimed_at < cutoff:
+                try:
+                    os.rename(claimed, os.path.join(self.outbox_dir, original))
+                    logger.warning(f"📮 Released stale outbox claim: {name}")
+                except FileNotFoundError:
+                    pass
+    
+    def _outbox_files(self) -> List[str]:
+        """Queued outbox messages, oldest first"""
+        try:
+            names = sorted(os.listdir(self.outbox_dir))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.outbox_dir, name) for name in names if name.endswith('.json')]
+    
+    def _outbox_email(self, subject: str, body: str, to_email: str, reason: str):
+        """Persist an email to the outbox for later delivery"""
+        os.makedirs(self.outbox_dir, exist_ok=True)
+        # Time-ordered names so the outbox drains oldest first
+        name = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.json"
+        path = os.path.join(self.outbox_dir, name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({"subject": subject, "body": body, "to_email": to_email}, f)
+        os.replace(path + '.tmp', path)
+        logger.warning(f"📮 {reason} - lead email queued in outbox: {name}")
+    
+    async def flush_outbox(self):
+        """Deliver queued outbox emails until the outbox is empty or SMTP is busy again.
+
+        Every worker shares the outbox directory, so each message is claimed
+        by renaming it before delivery; a message another flush (in this or
+        another worker) already claimed is skipped.
+        """
+        self._flushing_outbox = True
+        try:
+            for path in self._outbox_files():
+                claimed = f"{path}.{os.getpid()}-{time.time_ns()}{OUTBOX_CLAIM_SUFFIX}"
+                try:
+                    os.rename(path, claimed)
+                except FileNotFoundError:
+                    continue  # someone else took it
+                self._claims.add(claimed)
+                try:
+                    with open(claimed) as f:
+                        message = json.load(f)
+                    await call_upstream(
+                        self.bulkhead,
+                        self.breaker,
+                        self._deliver_smtp,
+                        message["subject"],
+                        message["body"],
+                        message["to_email"],
+                    )
+                except (BulkheadFull, CircuitOpen):
+                    os.replace(claimed, path)  # not delivered: put it back for the next flush
+                    return
+                except Exception as e:
+                    os.replace(claimed, path)
+                    logger.error(f"❌ Outbox delivery failed, will retry later: {e}")
+                    return
+                except BaseException:
+                    os.replace(claimed, path)
+                    raise
+                finally:
+                    self._claims.discard(claimed)
+                try:
+                    os.remove(claimed)
+                except FileNotFoundError:
+                    pass
+                logger.info(f"📮 Delivered queued email: {os.path.basename(path)}")
+        finally:
+            self._flushing_outbox = False
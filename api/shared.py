@@ -0,0 +1,196 @@
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+import orjson
+
+from config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows - no flock, so no cross-process coordination
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# magic, generation, published_at (unix time)
+_HEADER = struct.Struct("<8sQd")
+_MAGIC = b"CQCAT001"
+
+
+def _safe_name(key: str) -> str:
+    """Stable file-name-safe token for a key (e.g. an Airtable base id)"""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class SharedCatalog:
+    """Catalog snapshot shared by every worker process on the host.
+
+    The worker that refreshes from Airtable writes the records to a file
+    (header + JSON array) and atomically renames it into place. Other
+    workers notice the new inode with a stat() call and map the file
+    read-only; the bytes live once in the page cache no matter how many
+    workers read them, and each worker decodes a generation only once.
+
+    An exclusive flock on a sidecar lock file elects the single refresher;
+    it is released automatically if that worker dies.
+    """
+
+    def __init__(self, directory: str, key: str):
+        self.directory = directory
+        name = _safe_name(key)
+        self.path = os.path.join(directory, f"catalog-{name}.bin")
+        self._lock_path = os.path.join(directory, f"catalog-{name}.lock")
+        self._lock_fd: Optional[int] = None
+        self._seen: Optional[Tuple[int, int]] = None
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _identity(stat: os.stat_result) -> Tuple[int, int]:
+        return stat.st_ino, stat.st_mtime_ns
+
+    def changed(self) -> bool:
+        """True if a generation this worker hasn't loaded has been published"""
+        try:
+            return self._identity(os.stat(self.path)) != self._seen
+        except FileNotFoundError:
+            return False
+
+    def load(self) -> Optional[Tuple[int, float, List[Dict]]]:
+        """Read the published catalog as (generation, age in seconds, cars), or None"""
+        try:
+            with open(self.path, "rb") as f:
+                identity = self._identity(os.fstat(f.fileno()))
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    magic, generation, published_at = _HEADER.unpack_from(mapped)
+                    if magic != _MAGIC:
+                        logger.warning(f"⚠️ Ignoring shared catalog with unknown format: {self.path}")
+                        return None
+                    payload = memoryview(mapped)[_HEADER.size:]
+                    try:
+                        cars = orjson.loads(payload)
+                    finally:
+                        payload.release()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"⚠️ Could not read shared catalog: {e}")
+            return None
+        self._seen = identity
+        return generation, max(0.0, time.time() - published_at), cars
+
+    def publish(self, cars: List[Dict]) -> int:
+        """Atomically replace the shared catalog; returns the new generation"""
+        generation = time.time_ns() // 1_000_000
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, generation, time.time()))
+            f.write(orjson.dumps(cars))
+        os.replace(tmp_path, self.path)
+        self._seen = self._identity(os.stat(self.path))
+        return generation
+
+    def try_acquire_refresh(self) -> bool:
+        """Become the refreshing worker, unless another worker already is"""
+        if fcntl is None:
+            return True
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def release_refresh(self):
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # closing drops the flock
+            self._lock_fd = None
+
+
+class SharedCache:
+    """Small key/value cache in SQLite (WAL mode) shared by all workers.
+
+    Values are JSON-serialisable objects with a per-entry TTL. Each thread
+    gets its own connection; calls are short, but callers on the event
+    loop should still go through asyncio.to_thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            # Lets the cleanup in set() find expired rows without scanning the table
+            db.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def make_key(namespace: str, *parts: Any) -> str:
+        return f"{namespace}:" + hashlib.sha256(orjson.dumps(parts)).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Shared cache read failed: {e}")
+            return None
+        return orjson.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        try:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, orjson.dumps(value), time.time() + ttl),
+            )
+            # Opportunistic cleanup keeps the file from growing without bound
+            db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Shared cache write failed: {e}")
+
+
+def open_shared_catalog(key: str) -> Optional[SharedCatalog]:
+    """SharedCatalog under SHARED_STATE_DIR, or None when sharing is off or unsupported"""
+    if not settings.shared_state_dir:
+        return None
+    if fcntl is None:
+        logger.warning("⚠️ No flock on this platform - each worker keeps its own catalog")
+        return None
+    try:
+        return SharedCatalog(settings.shared_state_dir, key)
+    except OSError as e:
+        logger.warning(f"⚠️ Shared catalog disabled: {e}")
+        return None
+
+
+def open_shared_cache() -> Optional[SharedCache]:
+    """SharedCache under SHARED_STATE_DIR, or None when sharing is off"""
+    if not settings.shared_state_dir:
+        return None
+    try:
+        return SharedCache(os.path.join(settings.shared_state_dir, "cache.sqlite3"))
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"⚠️ Shared cache disabled: {e}")
+        return None
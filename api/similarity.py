@@ -0,0 +1,183 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+from functools import lru_cache
+import heapq
+import math
+import re
+import statistics
+
+from scoring import LUXURY_BRANDS, RELIABLE_BRANDS, SUPERCAR_BRANDS
+
+# Distance weights. Categorical features sit in the bucket key, so the
+# whole bucket shares one penalty; price is the only per-car term.
+BODY_WEIGHT = 3.0        # different body type
+FUEL_WEIGHT = 2.0        # different fuel group
+TIER_WEIGHT = 1.5        # per brand tier step (other/reliable/luxury/supercar)
+SEATS_WEIGHT = 0.5       # per seat
+PRICE_WEIGHT = 4.0       # per unit of |log(price ratio)| (~0.9 for a 25% price gap)
+
+# Bucket orderings remembered per query bucket (real catalogs have far fewer buckets)
+_ORDER_CACHE_SIZE = 1024
+
+_PRICE_NUMBER = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kK])?")
+_SEATS_NUMBER = re.compile(r"\d+")
+
+BucketKey = Tuple[int, str, str, int]
+
+
+def brand_tier(brand: str) -> int:
+    if brand in SUPERCAR_BRANDS:
+        return 3
+    if brand in LUXURY_BRANDS:
+        return 2
+    if brand in RELIABLE_BRANDS:
+        return 1
+    return 0
+
+
+def fuel_group(fuel_type: str) -> str:
+    fuel = fuel_type.lower()
+    if "plug-in" in fuel or "phev" in fuel:
+        return "phev"
+    if "electric" in fuel or fuel == "ev":
+        return "electric"
+    if "hybrid" in fuel:
+        return "hybrid"
+    if "diesel" in fuel:
+        return "diesel"
+    return "petrol"
+
+
+@lru_cache(maxsize=16384)
+def parse_price_bounds(price_range: str) -> Optional[Tuple[float, float]]:
+    """(low, high) of a price range like '$45,000-$55,000' or '$45k-$55k'"""
+    values = []
+    for number, thousands in _PRICE_NUMBER.findall(price_range or ""):
+        value = float(number.replace(",", ""))
+        values.append(value * 1000 if thousands else value)
+    values = [value for value in values if value > 0]
+    return (min(values), max(values)) if values else None
+
+
+def parse_price(price_range: str) -> Optional[float]:
+    """Midpoint of a price range, or None if it has no price"""
+    bounds = parse_price_bounds(price_range)
+    return (bounds[0] + bounds[1]) / 2 if bounds else None
+
+
+def parse_seats(seats: str) -> int:
+    digits = _SEATS_NUMBER.search(str(seats))
+    return int(digits.group()) if digits else 5
+
+
+def bucket_key(car: Dict) -> BucketKey:
+    return (
+        brand_tier(car.get("brand", "")),
+        car.get("body_type", "").strip().lower(),
+        fuel_group(car.get("fuel_type", "")),
+        parse_seats(car.get("seats", "5")),
+    )
+
+
+def bucket_penalty(a: BucketKey, b: BucketKey) -> float:
+    tier_a, body_a, fuel_a, seats_a = a
+    tier_b, body_b, fuel_b, seats_b = b
+    return (
+        TIER_WEIGHT * abs(tier_a - tier_b)
+        + (BODY_WEIGHT if body_a != body_b else 0.0)
+        + (FUEL_WEIGHT if fuel_a != fuel_b else 0.0)
+        + SEATS_WEIGHT * abs(seats_a - seats_b)
+    )
+
+
+class SimilarityIndex:
+    """Exact k-nearest-neighbour index over catalog feature vectors.
+
+    Each car maps to a bucket key (brand tier, body type, fuel group,
+    seats) and a log price; cars without a parseable price get the
+    catalog median. Buckets hold their cars sorted by log price.
+
+    A query walks buckets in increasing penalty and, inside each, expands
+    outwards from the query price, stopping as soon as neither can beat
+    the current k-th best distance. That touches a handful of cars
+    instead of the whole catalog.
+    """
+
+    def __init__(self, cars: Sequence[Dict]):
+        prices = [parse_price(car.get("price_range", "")) for car in cars]
+        known = [price for price in prices if price]
+        default_price = statistics.median(known) if known else 1.0
+
+        self._keys: List[BucketKey] = []
+        self._log_prices: List[float] = []
+        members: Dict[BucketKey, List[Tuple[float, int]]] = {}
+        # Catalogs repeat a few brand/body/fuel/seats combinations many times
+        keys: Dict[Tuple, BucketKey] = {}
+        for index, (car, price) in enumerate(zip(cars, prices)):
+            raw = (car.get("brand"), car.get("body_type"), car.get("fuel_type"), car.get("seats"))
+            key = keys.get(raw)
+            if key is None:
+                key = keys[raw] = bucket_key(car)
+            log_price = math.log(price or default_price)
+            self._keys.append(key)
+            self._log_prices.append(log_price)
+            members.setdefault(key, []).append((log_price, index))
+
+        # bucket key -> (sorted log prices, car indexes in the same order)
+        self._buckets: Dict[BucketKey, Tuple[List[float], List[int]]] = {}
+        for key, entries in members.items():
+            entries.sort()
+            self._buckets[key] = ([price for price, _ in entries], [index for _, index in entries])
+        self._orders: Dict[BucketKey, List[Tuple[float, BucketKey]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _bucket_order(self, key: BucketKey) -> List[Tuple[float, BucketKey]]:
+        order = self._orders.get(key)
+        if order is None:
+            order = sorted((bucket_penalty(key, other), other) for other in self._buckets)
+            if len(self._orders) >= _ORDER_CACHE_SIZE:
+                self._orders.pop(next(iter(self._orders)))
+            self._orders[key] = order
+        return order
+
+    def neighbours(self, index: int, k: int) -> List[Tuple[float, int]]:
+        """The k cars closest to car `index` as (distance, index), nearest first"""
+        key, target = self._keys[index], self._log_prices[index]
+        # Max-heap of the best k so far as (-distance, -index)
+        best: List[Tuple[float, int]] = []
+
+        for penalty, other in self._bucket_order(key):
+            if len(best) == k and penalty > -best[0][0]:
+                break
+            prices, indexes = self._buckets[other]
+            hi = bisect_left(prices, target)
+            lo = hi - 1
+            while lo >= 0 or hi < len(prices):
+                below = target - prices[lo] if lo >= 0 else math.inf
+                above = prices[hi] - target if hi < len(prices) else math.inf
+                if below <= above:
+                    position, gap = lo, below
+                    lo -= 1
+                else:
+                    position, gap = hi, above
+                    hi += 1
+                distance = penalty + PRICE_WEIGHT * gap
+                if len(best) == k and distance > -best[0][0]:
+                    break
+                candidate = indexes[position]
+                if candidate == index:
+                    continue
+                entry = (-distance, -candidate)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+
+        return sorted((-distance, -candidate) for distance, candidate in best)
+
+
+def similarity_score(distance: float) -> int:
+    """Map a distance to 0-100 (100 = identical features)"""
+    return round(100 / (1 + distance))